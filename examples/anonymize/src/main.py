@@ -15,6 +15,7 @@ from mob_data_anonymizer.distances.trajectory.Martinez2021.Distance import Dista
 from mob_data_anonymizer.aggregation.Martinez2021.Aggregation import Aggregation
 from mob_data_anonymizer.clustering.MDAV.SimpleMDAV import SimpleMDAV
 from mob_data_anonymizer.clustering.MDAV.SimpleMDAVDataset import SimpleMDAVDataset
+from mob_data_anonymizer.clustering.ClusteringListener import ProgressBarListener
 # from mob_data_anonymizer.clustering.MDAV.SimpleMDAV_ant import SimpleMDAV_ant
 # from mob_data_anonymizer.clustering.MDAV.SimpleMDAVDataset_ant import SimpleMDAVDataset_ant
 
@@ -74,7 +75,8 @@ elif METHOD_NAME == "Microaggregation":
     Martinez2021_distance = Distance(dataset, landa=DISTANCE_LANDA)
     # Martinez2021_distance = Distance(dataset)
     aggregation_method = Aggregation
-    clustering_method = SimpleMDAV(SimpleMDAVDataset(dataset, Martinez2021_distance, aggregation_method))
+    clustering_method = SimpleMDAV(SimpleMDAVDataset(dataset, Martinez2021_distance, aggregation_method),
+                                   listeners=[ProgressBarListener()])
     anonymizer = Microaggregation(dataset, k=K, clustering_method=clustering_method,
                                   distance=Martinez2021_distance, aggregation_method=aggregation_method)
 elif METHOD_NAME == "Microaggregation2":
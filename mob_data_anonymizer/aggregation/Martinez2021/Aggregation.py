@@ -1,5 +1,7 @@
 from random import randint
 
+import numpy as np
+
 from mob_data_anonymizer.aggregation.TrajectoryAggregationInterface import TrajectoryAggregationInterface
 from mob_data_anonymizer.entities.TimestampedLocation import TimestampedLocation
 from mob_data_anonymizer.entities.Trajectory import Trajectory
@@ -10,32 +12,52 @@ class Aggregation(TrajectoryAggregationInterface):
     @staticmethod
     def compute(trajectories: list) -> Trajectory:
 
-        # Avg of trajectories length
-        len_avgs = [len(t) for t in trajectories]
-        centroid_length = round(sum(len_avgs) / len(trajectories))
+        x, y, ts = Aggregation.compute_arrays(trajectories)
 
-        # Length ratio
-        gaps = list(map(lambda t: round(len(t) / centroid_length, 2), trajectories))
-
-        aggregated_locations = []
-        temp_locations = []
-        indexes = [0.0] * len(trajectories)
-        for i in range(0, centroid_length):
-            # Gathering the corresponding location of every trajectory
-            for idx, t in enumerate(trajectories):
-                index = int(indexes[idx])
-                if index >= len(t):
-                    index = len(t) - 1
-                temp_locations.append(t.locations[index])
-
-            # Compute locations centroid
-            aggregated_locations.append(TimestampedLocation.compute_centroid(temp_locations))
-            temp_locations = []
-
-            # Compute new indexes
-            indexes = [x + y for x, y in zip(indexes, gaps)]
+        # Same rounding than TimestampedLocation.compute_centroid
+        aggregated_locations = [TimestampedLocation(round(l_ts, 5), round(l_x, 5), round(l_y, 5))
+                                for l_ts, l_x, l_y in zip(ts.tolist(), x.tolist(), y.tolist())]
 
         aggregated_trajectory = Trajectory("C_"+str(randint(0, 10000)))
         aggregated_trajectory.add_locations(aggregated_locations)
 
         return aggregated_trajectory
+
+    @staticmethod
+    def compute_arrays(trajectories: list) -> tuple:
+        '''
+        Compute the (unrounded) centroid of the trajectories as NumPy arrays
+        :param trajectories: trajectories to be aggregated
+        :return: tuple of arrays (x, y, timestamp), one value per centroid location
+        '''
+
+        # Avg of trajectories length
+        lengths = np.array([len(t) for t in trajectories], dtype=np.int64)
+        centroid_length = round(int(lengths.sum()) / len(trajectories))
+
+        # Length ratio
+        gaps = np.array([round(length / centroid_length, 2) for length in lengths.tolist()])
+
+        # Index of the location of every trajectory for every centroid position. The cumulative sum performs the same
+        # sequence of float additions than increasing the indexes by the gap one step at a time
+        steps = np.repeat(gaps[:, np.newaxis], centroid_length, axis=1)
+        steps[:, 0] = 0.0
+        indexes = np.cumsum(steps, axis=1).astype(np.int64)
+        indexes = np.minimum(indexes, (lengths - 1)[:, np.newaxis])
+
+        # Gather the corresponding location of every trajectory from the flattened locations
+        offsets = np.cumsum(lengths) - lengths
+        indexes += offsets[:, np.newaxis]
+
+        total = int(lengths.sum())
+        locations = [l for t in trajectories for l in t.locations]
+        xs = np.fromiter((l.x for l in locations), dtype=np.float64, count=total)
+        ys = np.fromiter((l.y for l in locations), dtype=np.float64, count=total)
+        tss = np.fromiter((l.timestamp for l in locations), dtype=np.int64, count=total)
+
+        # Compute locations centroid (rows are added in trajectory order)
+        x = xs[indexes].sum(axis=0) / len(trajectories)
+        y = ys[indexes].sum(axis=0) / len(trajectories)
+        ts = tss[indexes].sum(axis=0) / len(trajectories)
+
+        return x, y, ts
@@ -6,6 +6,7 @@ from mob_data_anonymizer.aggregation.Martinez2021.Aggregation import Aggregation
 from mob_data_anonymizer.aggregation.TrajectoryAggregationInterface import TrajectoryAggregationInterface
 from mob_data_anonymizer.anonymization_methods.AnonymizationMethodInterface import AnonymizationMethodInterface
 from mob_data_anonymizer.clustering.ClusteringInterface import ClusteringInterface
+from mob_data_anonymizer.clustering.ClusteringListener import ProgressBarListener
 from mob_data_anonymizer.clustering.MDAV.SimpleMDAV import SimpleMDAV
 from mob_data_anonymizer.clustering.MDAV.SimpleMDAVDataset import SimpleMDAVDataset
 from mob_data_anonymizer.distances.trajectory.DistanceInterface import DistanceInterface
@@ -32,7 +33,8 @@ class SwapLocations(AnonymizationMethodInterface):
         self.distance = distance if distance else Distance(dataset)
         self.aggregation_method = aggregation_method if aggregation_method else Aggregation
         self.clustering_method = clustering_method if clustering_method \
-            else SimpleMDAV(SimpleMDAVDataset(dataset, self.distance, self.aggregation_method))
+            else SimpleMDAV(SimpleMDAVDataset(dataset, self.distance, self.aggregation_method),
+                            listeners=[ProgressBarListener()])
 
         self.clusters = {}
         self.anonymized_dataset = dataset.__class__()
@@ -7,7 +7,7 @@ from mob_data_anonymizer.anonymization_methods.AnonymizationMethodInterface impo
 from mob_data_anonymizer.anonymization_methods.SwapLocations.trajectory_anonymization import \
     apply_trajectory_anonymization
 from mob_data_anonymizer.entities.Dataset import Dataset
-from mob_data_anonymizer.utils.tessellation import spatial_tessellation
+from mob_data_anonymizer.utils.tessellation import spatial_tessellation, get_centroids
 
 DEFAULT_VALUES = {
     "gen_tile_size": 500,
@@ -38,11 +38,12 @@ class SimpleGeneralization(AnonymizationMethodInterface):
         # print(mtdf.head(5))
         # print(tiles.head(5))
 
-        tiles['x'] = round(tiles['geometry'].centroid.x, 5)
-        tiles['y'] = round(tiles['geometry'].centroid.y, 5)
+        centroids = get_centroids(tiles)
+        centroids['x'] = round(centroids['x'], 5)
+        centroids['y'] = round(centroids['y'], 5)
 
         # Add tiles centroids to mapped tdf
-        mtdf = pd.merge(mtdf, tiles, how="left", on="tile_ID")
+        mtdf = pd.merge(mtdf, centroids, how="left", on="tile_ID")
 
         # Rename and reorder columns
         mtdf.rename(columns={
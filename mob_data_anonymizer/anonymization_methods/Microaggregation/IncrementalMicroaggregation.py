@@ -0,0 +1,132 @@
+import itertools
+import logging
+import time
+
+import numpy as np
+
+from mob_data_anonymizer.aggregation import TrajectoryAggregationInterface
+from mob_data_anonymizer.anonymization_methods.Microaggregation.Microaggregation import Microaggregation, \
+    DEFAULT_VALUES
+from mob_data_anonymizer.clustering.ClusteringInterface import ClusteringInterface
+from mob_data_anonymizer.distances.trajectory.DistanceInterface import DistanceInterface
+from mob_data_anonymizer.entities.Dataset import Dataset
+from mob_data_anonymizer.entities.Trajectory import Trajectory
+
+
+class IncrementalMicroaggregation(Microaggregation):
+    def __init__(self, dataset: Dataset, k=DEFAULT_VALUES['k'], clustering_method: ClusteringInterface = None,
+                 distance: DistanceInterface = None, aggregation_method: TrajectoryAggregationInterface = None):
+        """
+                Microaggregation that can be updated with new trajectories (see append) without clustering the whole
+                dataset again. The clusters and centroids of the previous runs are kept: new trajectories are
+                assigned to the existing cluster whose centroid is closest (when they fall within its radius) or
+                grouped in new clusters of at least k trajectories, and just the touched clusters are aggregated again.
+
+                Parameters
+                ----------
+                dataset : Dataset
+                    Dataset to anonymize.
+                k : int
+                    Mínimium number of trajectories to be aggregated in a cluster (default is 3)
+                clustering_method : ClusteringInterface, optional
+                    Method to cluster the trajectories (Default is SimpleMDAV)
+                distance : DistanceInterface, optional
+                    Method to compute the distance between two trajectories (Default is Martinez2021.Distance)
+                aggregation_method : TrajectoryAggregationInterface, optional
+                    Method to aggregate the trajectories within a cluster (Default is Martinez2021.Aggregation)
+                """
+        super().__init__(dataset, k=k, clustering_method=clustering_method, distance=distance,
+                         aggregation_method=aggregation_method)
+
+        self.radius = {}                        # Max distance from the centroid to the trajectories of every cluster
+        self.centroid_counter = itertools.count()
+
+    def run(self):
+        self.centroids = {}
+        self.radius = {}
+        super().run()
+
+        logging.info("Computing clusters radius...")
+        for c in self.clusters:
+            self.__set_centroid(c, self.centroids[c])
+
+    def append(self, trajectories: list) -> set:
+        """
+        Add new trajectories to the dataset and update the anonymized dataset.
+
+        Parameters
+        ----------
+        trajectories : list
+            New trajectories. Their ids must not be already in the dataset.
+
+        Returns
+        -------
+        touched : set
+            Ids of the clusters created or modified
+        """
+        if not self.clusters:
+            raise RuntimeError("Microaggregation must be run before appending trajectories")
+
+        start = time.time()
+        for i, t in enumerate(trajectories, start=len(self.dataset)):
+            t.index = i
+        self.dataset.trajectories.extend(trajectories)
+
+        # Closest existing cluster of every new trajectory
+        cluster_ids = list(self.clusters.keys())
+        touched = set()
+        remaining = []
+        nearest = {}
+        centroids = [self.centroids[c] for c in cluster_ids]
+        for t in trajectories:
+            distances = self.__distances(t, centroids)
+            c, d = cluster_ids[np.argmin(distances)], distances.min()
+            nearest[t.index] = c
+            if d <= self.radius[c]:
+                # Within the cluster, join it
+                self.clusters[c].append(t)
+                touched.add(c)
+            else:
+                remaining.append(t)
+
+        if len(remaining) >= self.k:
+            # Cluster the rest of new trajectories among themselves
+            new_dataset = self.dataset.__class__()
+            new_dataset.trajectories = remaining
+            self.clustering_method.set_original_dataset(self.dataset)
+            self.clustering_method.set_dataset(new_dataset)
+            self.clustering_method.run(self.k)
+
+            next_id = max(cluster_ids) + 1
+            for i, cluster_trajectories in enumerate(self.clustering_method.get_clusters().values()):
+                self.clusters[next_id + i] = cluster_trajectories
+                touched.add(next_id + i)
+        else:
+            # Not enough trajectories to build a new cluster, they join their closest one
+            for t in remaining:
+                c = nearest[t.index]
+                self.clusters[c].append(t)
+                touched.add(c)
+
+        # Aggregate just the touched clusters
+        for c in touched:
+            self.__set_centroid(c, self.aggregation_method.compute(self.clusters[c]))
+
+        self.cluster_blocks = [(self.centroids[c], [t.id for t in self.clusters[c]]) for c in self.clusters]
+        self.build_anonymized_dataset()
+
+        end = time.time()
+        logging.info(f"{len(trajectories)} trajectories appended, {len(touched)} clusters updated. "
+                     f"Time: {end - start}")
+
+        return touched
+
+    def __set_centroid(self, c, centroid: Trajectory):
+        # Every version of a centroid gets its own id, so distances cached by id are never reused for it
+        centroid.id = f"IC_{next(self.centroid_counter)}"
+        self.centroids[c] = centroid
+        self.radius[c] = self.__distances(centroid, self.clusters[c]).max()
+
+    def __distances(self, trajectory: Trajectory, trajectories: list) -> np.ndarray:
+        d = self.distance.compute_one_to_many(trajectory, trajectories)
+        return np.where(np.isnan(d), np.inf, d)
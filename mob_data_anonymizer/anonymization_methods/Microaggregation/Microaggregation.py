@@ -5,6 +5,7 @@ from mob_data_anonymizer.aggregation import TrajectoryAggregationInterface
 from mob_data_anonymizer.aggregation.Martinez2021.Aggregation import Aggregation
 from mob_data_anonymizer.anonymization_methods.AnonymizationMethodInterface import AnonymizationMethodInterface
 from mob_data_anonymizer.clustering.ClusteringInterface import ClusteringInterface
+from mob_data_anonymizer.clustering.ClusteringListener import ProgressBarListener
 from mob_data_anonymizer.clustering.MDAV.SimpleMDAV import SimpleMDAV
 from mob_data_anonymizer.clustering.MDAV.SimpleMDAVDataset import SimpleMDAVDataset
 from mob_data_anonymizer.distances.trajectory.DistanceInterface import DistanceInterface
@@ -39,10 +40,12 @@ class Microaggregation(AnonymizationMethodInterface):
         self.distance = distance if distance else Distance(dataset)
         self.aggregation_method = aggregation_method if aggregation_method else Aggregation
         self.clustering_method = clustering_method if clustering_method \
-            else SimpleMDAV(SimpleMDAVDataset(dataset, self.distance, self.aggregation_method))
+            else SimpleMDAV(SimpleMDAVDataset(dataset, self.distance, self.aggregation_method),
+                            listeners=[ProgressBarListener()])
 
         self.clusters = {}
         self.centroids = {}
+        self.cluster_blocks = []
         self.anonymized_dataset = dataset.__class__()
 
         self.k = k
@@ -64,8 +67,9 @@ class Microaggregation(AnonymizationMethodInterface):
         logging.info("Building anonymized dataset...")
         self.clusters = self.clustering_method.get_clusters()
 
+        self.cluster_blocks = []
         self.process_clusters()
-        self.anonymized_dataset.trajectories.sort(key=lambda t: t.id)
+        self.build_anonymized_dataset()
 
         logging.info('Anonymization finished!')
 
@@ -73,16 +77,27 @@ class Microaggregation(AnonymizationMethodInterface):
         for c in self.clusters:
             cluster_trajectories = self.clusters[c]
 
-            # Initialize anonymized trajectories
-            anon_trajectories = list(map(lambda t: Trajectory(t.id), cluster_trajectories))
-
             aggregate_trajectory = self.aggregation_method.compute(cluster_trajectories)
             self.centroids[c] = aggregate_trajectory
 
-            # Add to anonymized dataset
-            for T in anon_trajectories:
-                T.add_locations(aggregate_trajectory.locations)
-                self.anonymized_dataset.add_trajectory(T)
+            # One block per cluster: the aggregated trajectory and the ids of the trajectories it replaces
+            self.cluster_blocks.append((aggregate_trajectory, [t.id for t in cluster_trajectories]))
+
+    def build_anonymized_dataset(self):
+        """
+        Materialize the anonymized dataset from the cluster blocks, sorted by trajectory id.
+        All the anonymized trajectories of a cluster share the list of locations of the aggregated trajectory, so
+        it must not be modified in place.
+        """
+        anon_trajectories = []
+        for aggregate_trajectory, trajectory_ids in self.cluster_blocks:
+            for t_id in trajectory_ids:
+                T = Trajectory(t_id)
+                T.locations = aggregate_trajectory.locations
+                anon_trajectories.append(T)
+
+        anon_trajectories.sort(key=lambda t: t.id)
+        self.anonymized_dataset.trajectories = anon_trajectories
 
     def get_clusters(self):
         return self.clusters
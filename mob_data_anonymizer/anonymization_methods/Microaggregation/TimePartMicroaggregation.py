@@ -45,6 +45,7 @@ class TimePartMicroaggregation(AnonymizationMethodInterface):
 
         self.clusters = {}
         self.centroids = {}
+        self.cluster_blocks = []
         self.anonymized_dataset = dataset.__class__()
 
         self.k = k
@@ -78,6 +79,7 @@ class TimePartMicroaggregation(AnonymizationMethodInterface):
         datasets[-1].trajectories.extend(ordered_trajectories)
 
         # Clustering
+        self.cluster_blocks = []
         self.clustering_method.set_original_dataset(self.dataset)
         start = time.time()
         logging.info("Starting clustering...")
@@ -90,7 +92,7 @@ class TimePartMicroaggregation(AnonymizationMethodInterface):
             self.clusters = self.clustering_method.get_clusters()
             self.process_clusters()
         logging.info("Building anonymized dataset...")
-        self.anonymized_dataset.trajectories.sort(key=lambda t: t.id)
+        self.build_anonymized_dataset()
         end = time.time()
         logging.info(f"Clustering finished! Time: {end - start}")
         logging.debug(self.clustering_method.mdav_dataset.assigned_to)
@@ -100,16 +102,28 @@ class TimePartMicroaggregation(AnonymizationMethodInterface):
         for c in self.clusters:
             cluster_trajectories = self.clusters[c]
 
-            # Initialize anonymized trajectories
-            anon_trajectories = list(map(lambda t: Trajectory(t.id, t.user_id), cluster_trajectories))
-
             aggregate_trajectory = self.aggregation_method.compute(cluster_trajectories)
             self.centroids[c] = aggregate_trajectory
 
-            # Add to anonymized dataset
-            for T in anon_trajectories:
-                T.add_locations(aggregate_trajectory.locations)
-                self.anonymized_dataset.add_trajectory(T)
+            # One block per cluster: the aggregated trajectory and the ids of the trajectories it replaces
+            self.cluster_blocks.append((aggregate_trajectory,
+                                        [(t.id, t.user_id) for t in cluster_trajectories]))
+
+    def build_anonymized_dataset(self):
+        """
+        Materialize the anonymized dataset from the cluster blocks of all the partitions, sorted by trajectory id.
+        All the anonymized trajectories of a cluster share the list of locations of the aggregated trajectory, so
+        it must not be modified in place.
+        """
+        anon_trajectories = []
+        for aggregate_trajectory, trajectory_ids in self.cluster_blocks:
+            for t_id, user_id in trajectory_ids:
+                T = Trajectory(t_id, user_id)
+                T.locations = aggregate_trajectory.locations
+                anon_trajectories.append(T)
+
+        anon_trajectories.sort(key=lambda t: t.id)
+        self.anonymized_dataset.trajectories = anon_trajectories
 
     def get_clusters(self):
         return self.clusters
@@ -1,70 +1,91 @@
 import logging
 import random
 
+import numpy as np
 from tqdm import tqdm
 
 from mob_data_anonymizer.entities.Dataset import Dataset
 from mob_data_anonymizer.entities.Trajectory import Trajectory
+from mob_data_anonymizer.utils.SpatioTemporalGrid import SpatioTemporalGrid
 
 
 class MegaSwap:
-    def __init__(self, dataset: Dataset, R_s, R_t):
+    def __init__(self, dataset: Dataset, R_s, R_t, seed: int = None):
+        """
+        Parameters
+        ----------
+        dataset : Dataset
+            Dataset to anonymize.
+        R_s : float
+            Spatial radius of the swapping groups (in km)
+        R_t : float
+            Temporal threshold of the swapping groups (in seconds)
+        seed : int, optional
+            Seed for the random swapping process (default is None, so seed is not fixed)
+        """
         self.dataset = dataset
         self.anonymized_dataset = dataset.__class__()
         self.R_s = R_s
         self.R_t = R_t
+        self.seed = seed
 
     def run(self):
 
+        # Set seed
+        if self.seed is not None:
+            random.seed(self.seed)
+
         # Create anon trajectories
         for t in self.dataset.trajectories:
             self.anonymized_dataset.add_trajectory(Trajectory(t.id))
         logging.info("Anonymized dataset initialized!")
 
-        # All locations to be swapped in just one list, with her original trajectory
-        remaining_locations = []
-        for t in self.dataset.trajectories:
-            for l in t.locations:
-                remaining_locations.append((t.id, l))
+        # All locations to be swapped in just one pool, with her original trajectory
+        remaining_locations = LocationPool(self.dataset.trajectories, self.R_s, self.R_t)
+        anonymized_trajectories = {t.id: t for t in reversed(self.anonymized_dataset.trajectories)}
 
         logging.info("Swapping...")
         pbar = tqdm(total=len(remaining_locations))
 
-        while remaining_locations:
+        while len(remaining_locations) > 0:
 
             # logging.info(f"Remaining locations: {len(remaining_locations)}")
 
             # Choose one
-            landa = random.choice(remaining_locations)
+            landa = remaining_locations.choice()
+            landa_location = remaining_locations.get_location(landa)
 
             # Find all nearest locations
             U = [landa]
 
-            for l in [l_2 for l_2 in remaining_locations if l_2[0] != landa[0]]:
+            for l in remaining_locations.get_candidates(landa):
+                location = remaining_locations.get_location(l)
 
                 # Check temporal distance from 'landa' to 'l'
-                if landa[1].temporal_distance(l[1]) <= self.R_t:
+                if landa_location.temporal_distance(location) <= self.R_t:
                     # Check spatial distance from 'landa' to 'l'
-                    distance = landa[1].spatial_distance(l[1])
+                    distance = landa_location.spatial_distance(location)
 
                     if 0 <= distance <= self.R_s:
                         U.append(l)
 
             if len(U) > 2:
                 # Assign every location to a random trajectory
-                trajectories_id = [l[0] for l in U]
+                trajectories_id = [remaining_locations.get_trajectory_id(l) for l in U]
                 random.shuffle(U)
 
                 for i, l in enumerate(U):
-                    an_t = self.anonymized_dataset.get_trajectory(trajectories_id[i])
-                    an_t.add_location(l[1])
+                    an_t = anonymized_trajectories[trajectories_id[i]]
+                    an_t.add_location(remaining_locations.get_location(l), sort=False)
 
             # Remove from remaining_locations
-            for l in U:
-                remaining_locations.remove(l)
+            remaining_locations.remove(U)
 
             pbar.update(len(U))
 
+        # Sorted once at the end (stable, as adding the locations sorted one by one)
+        for an_t in self.anonymized_dataset.trajectories:
+            an_t.locations.sort(key=lambda l: l.timestamp)
         logging.info("Swapping done!")
 
         self.anonymized_dataset.trajectories = [t for t in self.anonymized_dataset.trajectories if len(t) > 1]
@@ -74,3 +95,80 @@ class MegaSwap:
 
     def get_anonymized_dataset(self):
         return self.anonymized_dataset
+
+
+class LocationPool:
+    '''
+    Locations of a set of trajectories (in dataset order), from which they are removed. Locations are referred by
+    position and indexed with:
+    - active flags, with a Fenwick tree counting the active ones, to pick the k-th remaining location in O(log n)
+    - the trajectory (position within the dataset) of every location
+    - a time-sliced spatial grid (see SpatioTemporalGrid), so the candidate neighbours of a location are just the ones
+      in the adjacent cells
+    '''
+
+    def __init__(self, trajectories: list, R_s, R_t):
+        self.locations = [l for t in trajectories for l in t.locations]
+        self.trajectory_ids = [t.id for t in trajectories]
+        self.owners = np.repeat(np.arange(len(trajectories)), [len(t) for t in trajectories])
+        self.active = np.ones(len(self.locations), dtype=bool)
+        self.n_active = len(self.locations)
+
+        # Fenwick tree of the active flags
+        self.tree = [0] + [1] * len(self.locations)
+        for i in range(1, len(self.tree)):
+            j = i + (i & -i)
+            if j < len(self.tree):
+                self.tree[j] += self.tree[i]
+
+        x = np.array([l.x for l in self.locations])
+        y = np.array([l.y for l in self.locations])
+        timestamps = np.array([l.timestamp for l in self.locations], dtype=np.int64)
+        self.grid = SpatioTemporalGrid(x, y, timestamps, R_s, R_t)
+
+    def choice(self) -> int:
+        '''
+        Random remaining location, as random.choice over the list of remaining locations
+        '''
+        k = random.randrange(self.n_active)
+
+        # Position of the k-th active location
+        position = 0
+        step = 1 << (len(self.tree) - 1).bit_length()
+        while step:
+            if position + step < len(self.tree) and self.tree[position + step] <= k:
+                position += step
+                k -= self.tree[position]
+            step >>= 1
+
+        return position
+
+    def get_candidates(self, position: int) -> list:
+        '''
+        Remaining locations of other trajectories close to a location (within the adjacent cells of the grid), in
+        dataset order
+        '''
+        candidates = self.grid.get_candidates(self.grid.x[position], self.grid.y[position],
+                                              self.grid.timestamps[position])
+        candidates = candidates[self.active[candidates] & (self.owners[candidates] != self.owners[position])]
+
+        return np.sort(candidates).tolist()
+
+    def get_location(self, position: int):
+        return self.locations[position]
+
+    def get_trajectory_id(self, position: int):
+        return self.trajectory_ids[self.owners[position]]
+
+    def remove(self, positions: list):
+        for position in positions:
+            self.active[position] = False
+            self.n_active -= 1
+
+            i = position + 1
+            while i < len(self.tree):
+                self.tree[i] -= 1
+                i += i & -i
+
+    def __len__(self):
+        return self.n_active
@@ -4,13 +4,13 @@ import time
 from collections import defaultdict
 from copy import deepcopy
 
-import haversine
 import numpy as np
 from tqdm import tqdm
 
 from mob_data_anonymizer.entities.Dataset import Dataset
 from mob_data_anonymizer.entities.TimestampedLocation import TimestampedLocation
 from mob_data_anonymizer.entities.Trajectory import Trajectory
+from mob_data_anonymizer.utils.SpatioTemporalGrid import SpatioTemporalGrid
 
 
 class MegaSwapOptimized:
@@ -27,62 +27,48 @@ class MegaSwapOptimized:
             self.anonymized_dataset.add_trajectory(Trajectory(t.id))
         logging.info("Anonymized dataset initialized!")
 
-        # All locations to be swapped in just one list, with her original trajectory
-        # remaining_locations = []
-        # for t in self.dataset.trajectories:
-        #     for l in t.locations:
-        #         remaining_locations.append((t.id, l))
+        # All locations to be swapped in just one list, with the position of her original trajectory
+        owners = np.repeat(np.arange(len(self.dataset.trajectories)), [len(t) for t in self.dataset.trajectories])
+        x = np.array([l.x for t in self.dataset.trajectories for l in t.locations])
+        y = np.array([l.y for t in self.dataset.trajectories for l in t.locations])
+        timestamps = np.array([l.timestamp for t in self.dataset.trajectories for l in t.locations], dtype=np.int64)
 
-        remaining_locations = []
-        for t in self.dataset.trajectories:
-            for l in t.locations:
-                remaining_locations.append(np.array([t.id, l.x, l.y, l.timestamp]))
-
-        np_remaining_locations = np.array(remaining_locations).astype(np.float32)
+        # Locations bucketed by R_s and R_t, so just the adjacent cells are checked to find the nearest ones
+        grid = SpatioTemporalGrid(x, y, timestamps, self.R_s, self.R_t)
+        consumed = np.zeros(len(owners), dtype=bool)
+        anonymized_trajectories = self.anonymized_dataset.trajectories
 
         logging.info("Swapping...")
-        pbar = tqdm(total=len(remaining_locations))
-
-        while len(np_remaining_locations) > 0:
+        pbar = tqdm(total=len(owners))
 
-            # logging.info(f"Remaining locations: {len(remaining_locations)}")
-
-            # Choose one
-            landa = np_remaining_locations[np.random.choice(np_remaining_locations.shape[0])]
+        # Taking the next remaining location of a random permutation is choosing one of them at random
+        for landa in np.random.permutation(len(owners)):
+            if consumed[landa]:
+                continue
 
             # Find all nearest locations
-            U = np.array([landa])
-
-            candidates = np_remaining_locations[np.where(np_remaining_locations[:, 0] != landa[0])]
-
-            l_timestamp = landa[3]
-            candidates_timestamps = candidates[:, 3]
-
-            temporal_distances = np.abs(candidates_timestamps - l_timestamp)
-
-            indexes = np.argwhere(temporal_distances <= self.R_t).flatten()
-
-            selected_candidates = candidates[indexes]
-
-            spatial_distances = haversine.haversine_vector(landa[1:3], selected_candidates[:, 1:3], comb=True).flatten()
-
-            selected_candidates = selected_candidates[np.argwhere(spatial_distances <= self.R_s).flatten()]
-
-            U = np.vstack((U, selected_candidates))
+            candidates = grid.get_candidates(x[landa], y[landa], timestamps[landa])
+            candidates = candidates[~consumed[candidates] & (owners[candidates] != owners[landa])]
+            neighbours = grid.get_neighbours(x[landa], y[landa], timestamps[landa], self.R_s, self.R_t, candidates)
+            U = np.concatenate(([landa], neighbours))
 
             if len(U) > 2:
                 # Assign every location to a random trajectory
-                np.random.shuffle(U[:,0])
+                U_owners = owners[U]
+                np.random.shuffle(U_owners)
 
-                for c in U:
-                    an_t = self.anonymized_dataset.get_trajectory(c[0])
-                    an_t.add_location(TimestampedLocation(c[3], c[1], c[2]))
+                for i, owner in zip(U.tolist(), U_owners.tolist()):
+                    an_t = anonymized_trajectories[owner]
+                    an_t.add_location(TimestampedLocation(timestamps[i], x[i], y[i]), sort=False)
 
-            # Remove from np_remaining_locations
-            np_remaining_locations = np_remaining_locations[~np.all(np.isin(np_remaining_locations, U), axis=1)]
+            # Remove from the remaining locations
+            consumed[U] = True
 
             pbar.update(len(U))
 
+        # Sorted once at the end (stable, as adding the locations sorted one by one)
+        for an_t in anonymized_trajectories:
+            an_t.locations.sort(key=lambda l: l.timestamp)
         logging.info("Swapping done!")
 
         self.anonymized_dataset.trajectories = [t for t in self.anonymized_dataset.trajectories if len(t) > 1]
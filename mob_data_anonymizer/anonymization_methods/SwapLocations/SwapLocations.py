@@ -1,5 +1,8 @@
+import copy
 import logging
+import os
 import random
+from concurrent.futures import ProcessPoolExecutor
 
 import pandas
 from haversine import Unit, haversine, haversine_vector
@@ -12,6 +15,7 @@ from mob_data_anonymizer.anonymization_methods.SwapLocations.trajectory_anonymiz
 from mob_data_anonymizer.entities.Dataset import Dataset
 from mob_data_anonymizer.entities.Trajectory import Trajectory
 from mob_data_anonymizer.utils import utils
+from mob_data_anonymizer.utils.SpatioTemporalGrid import SpatioTemporalGrid
 
 DEFAULT_VALUES = {
     "k": 3,
@@ -22,13 +26,18 @@ DEFAULT_VALUES = {
     "tile_size": 1000,
 }
 
+# Size of the partitions of the dataset clustered in parallel (see SwapLocations.get_clusters_by_partition), in
+# cells of the spatio-temporal grid of LocationIndex (max_r_s meters and max_r_t seconds). At least 2
+PARTITION_CELLS = 8
+PARTITION_SLICES = 8
+
 
 class SwapLocations(AnonymizationMethodInterface):
     def __init__(self, dataset: Dataset, k=DEFAULT_VALUES['k'],
                  max_r_s=DEFAULT_VALUES['max_r_s'], max_r_t=DEFAULT_VALUES['max_r_t'],
                  min_r_s=DEFAULT_VALUES['min_r_s'], min_r_t=DEFAULT_VALUES['min_r_t'],
                  step_s=None, step_t=None, tile_size=DEFAULT_VALUES['tile_size'],
-                 seed: int = None):
+                 seed: int = None, n_jobs: int = 1):
         """
         Parameters
         ----------
@@ -51,7 +60,13 @@ class SwapLocations(AnonymizationMethodInterface):
         tile_size: int, optional
             Size of the tiles in tessellation used for trajectory anonymization (in meters)
         seed : int, optional
-            Seed for the random swapping process (default is None, so seed is not fixed)
+            Seed for the random swapping process (default is None, so seed is not fixed). It seeds a random
+            generator of its own, numpy's global one is not modified
+        n_jobs : int, optional
+            Number of processes building the swapping clusters (default is 1). With more than one, the dataset is
+            partitioned in space and time and partitions are clustered in parallel (see get_clusters_by_partition).
+            -1 for all the CPUs. For the same seed, results are the same with any n_jobs greater than 1, but they
+            differ from the ones with n_jobs = 1 (the whole dataset clustered at once).
         """
 
         self.dataset = dataset
@@ -69,82 +84,71 @@ class SwapLocations(AnonymizationMethodInterface):
 
         self.tile_size = tile_size
         self.seed = seed
+        self.n_jobs = n_jobs if n_jobs != -1 else os.cpu_count()
 
-    def __build_cluster(self, tdf, l):
+    def __build_cluster(self, index, position):
 
         temporal_range = utils.inclusive_range(self.min_r_t, self.max_r_t, self.step_t if self.step_t > 0 else None)
         spatial_range = utils.inclusive_range(self.min_r_s, self.max_r_s, self.step_s if self.step_s > 0 else None)
 
-        timestamp = l.iloc[0]['datetime']
+        # Remaining locations within max_r_t and max_r_s of this timestamped_location (and some farther ones), in tdf
+        # order. Locations out of them can't be in a cluster
+        candidates = index.get_candidates(position)
 
-        # Compute the time difference between this timestamped_location and the rest of locations in the tdf
-        tdf['dif_time'] = np.abs((tdf['datetime'] - timestamp).dt.total_seconds())
+        # Compute the time difference between this timestamped_location and the candidate locations
+        dif_time = index.get_time_differences(position, candidates)
+        distance = None
 
         for R_t in temporal_range:
 
-            # Compute the locations in the temporal range (tfd2 just keeps the locations within the temporal range)
-            tdf2 = tdf.query('dif_time <= @R_t').copy()
+            # Compute the locations in the temporal range
+            in_time = dif_time <= R_t
 
             # If not enough locations, check the next range
-            if len(tdf2) < self.k:
+            if np.count_nonzero(in_time) < self.k:
                 continue
 
             # We have enough locations, check the spatial range
 
-            # Compute all the distances from tdf2 points to our timestamped_location
-            tdf2['distance'] = haversine_vector(tdf2[['lat', 'lng']].to_numpy(), l[['lat', 'lng']].to_numpy(),
-                                                unit=Unit.METERS, comb=True).flatten()
+            # Compute all the distances from the candidate points to our timestamped_location (once, for all ranges)
+            if distance is None:
+                distance = index.get_distances(position, candidates)
 
             for R_s in spatial_range:
-                # tdf3 has all the locations inside both temporal and spatial range
-                tdf3 = tdf2.query('distance <= @R_s').copy()
+                # Positions of the candidates inside both temporal and spatial range
+                cluster = np.flatnonzero(in_time & (distance <= R_s))
                 # Keep just one location for each trajectory (don't swap locations of the same trajectory)
-                # We keep the locations temporally closer to the original one
-                tdf3 = tdf3.sort_values(by=['dif_time'])
-                tdf3 = tdf3.drop_duplicates(subset=['tid'], keep='first')
+                # We keep the locations temporally closer to the original one (same sort than pandas sort_values)
+                cluster = cluster[np.argsort(dif_time[cluster], kind='quicksort')]
+                _, first = np.unique(index.tids[candidates[cluster]], return_index=True)
+                cluster = cluster[np.sort(first)]
 
                 # If not enough locations, check the next spatial range
-                if len(tdf3) < self.k:
+                if len(cluster) < self.k:
                     continue
 
                 # We have enough locations!
-                return tdf3
+                return candidates[cluster], dif_time[cluster], distance[cluster]
 
         # There is no possible cluster
         return None
 
     def run(self):
-        num_cluster = 1
         pandas.options.display.width = 0
-        anon_tdf = pandas.DataFrame()
 
         tdf = self.dataset.to_tdf()
+        # Random generator of the swapping process, seeded if a seed is set
+        index = LocationIndex(tdf, self.max_r_s, self.max_r_t, random_state=np.random.RandomState(self.seed))
+        ids = tdf[['tid', 'uid']].to_numpy()
 
         pbar = tqdm(total=len(tdf))
         logging.info("Swapping...")
-        while not tdf.empty:
-
-            l = tdf.sample(random_state=self.seed)
-
-            cluster = self.__build_cluster(tdf, l)
-
-            if cluster is not None:
-                # We have a cluster!
-                # Remove locations to be swapped from original tdf
-                tdf = tdf.drop(cluster.index.tolist())
-
-                # Assign random trajectory to each location
-                cluster[['tid', 'uid']] = np.random.permutation(cluster[['tid', 'uid']])
-
-                cluster['num_cluster'] = num_cluster
+        if self.n_jobs == 1:
+            clusters = self.get_clusters(index, ids, pbar)
+        else:
+            clusters = self.get_clusters_by_partition(tdf, index, pbar)
 
-                anon_tdf = pandas.concat([anon_tdf, cluster], ignore_index=True)
-                num_cluster += 1
-                pbar.update(len(cluster))
-            else:
-                # Remove original location from tdf
-                tdf = tdf.drop(l.index.tolist())
-                pbar.update(len(l))
+        anon_tdf = self.__get_swapped_tdf(tdf, clusters)
 
         # Remove trajectories with just one location
         s = anon_tdf['tid'].value_counts()
@@ -164,6 +168,140 @@ class SwapLocations(AnonymizationMethodInterface):
 
         self.anonymized_dataset.from_tdf(anon_tdf)
 
+    def get_clusters(self, index, ids: np.ndarray, pbar=None) -> list:
+        '''
+        Swapping clusters built from random remaining locations, until there are no locations left to pick (see
+        LocationIndex.choice). Clustered locations and the ones without a cluster are removed from the index.
+        :param index: LocationIndex of the locations, whose random generator is used for the picks and swaps
+        :param ids: tid and uid of every location of the index
+        :param pbar: progress bar, updated with the number of locations removed
+        :return: list of clusters, as tuples with the positions of the swapped locations, their time difference and
+                 distance to the location the cluster was built from and their swapped tid and uid
+        '''
+        # Swapped locations, by cluster. The anonymized tdf is built from them once at the end
+        clusters = []
+
+        while len(index) > 0:
+
+            position = index.choice()
+
+            cluster = self.__build_cluster(index, position)
+
+            if cluster is not None:
+                # We have a cluster!
+                positions, dif_time, distance = cluster
+                # Remove locations to be swapped from the remaining locations
+                index.remove(positions)
+
+                # Assign random trajectory to each location
+                swapped_ids = index.random_state.permutation(ids[positions])
+
+                clusters.append((positions, dif_time, distance, swapped_ids))
+                if pbar is not None:
+                    pbar.update(len(positions))
+            else:
+                # Remove original location from the remaining locations
+                index.remove([position])
+                if pbar is not None:
+                    pbar.update(1)
+
+        return clusters
+
+    def get_clusters_by_partition(self, tdf, index, pbar=None) -> list:
+        '''
+        Swapping clusters (see get_clusters) built in parallel by partitions of the dataset.
+        Partitions are blocks of cells of the grid of the index, with the locations of the partition as the ones to
+        pick and the locations in the adjacent cells (the halo) as candidates for their clusters too. Partitions are
+        clustered in 8 rounds, by the parity of their position in time, latitude and longitude, so the partitions of a
+        round (and their halos) don't overlap. Locations removed by a round are not available for the next ones.
+        Every partition has its own random generator, seeded from the seed and the partition, so results just depend
+        on the seed, not on the number of processes (as long as it is greater than 1, run clusters the whole dataset
+        at once with n_jobs = 1, which gives different results).
+        :param tdf: TrajDataFrame of the locations of the index
+        :param index: LocationIndex of the whole dataset
+        :param pbar: progress bar, updated with the number of locations removed from the index by every partition
+        :return: list of clusters (see get_clusters)
+        '''
+        grid = index.grid
+        # Partitions of the columns, an even number of them so the first and the last ones (adjacent at the
+        # antimeridian) have different parity
+        n_partition_columns = max(grid.n_columns // PARTITION_CELLS, 1)
+        if n_partition_columns > 1 and n_partition_columns % 2 == 1:
+            n_partition_columns -= 1
+
+        def get_partition(cell):
+            time_slice, row, column = cell
+            return (time_slice // PARTITION_SLICES, row // PARTITION_CELLS,
+                    column * n_partition_columns // grid.n_columns)
+
+        # Cells of every partition and of its halo
+        partition_cells, halo_cells = {}, {}
+        for cell in grid.cells:
+            partition = get_partition(cell)
+            partition_cells.setdefault(partition, []).append(cell)
+            time_slice, row, column = cell
+            adjacent = {get_partition((time_slice + ds, row + dr, (column + dc) % grid.n_columns))
+                        for ds in (-1, 0, 1) for dr in (-1, 0, 1) for dc in (-1, 0, 1)}
+            for adjacent_partition in adjacent - {partition}:
+                halo_cells.setdefault(adjacent_partition, []).append(cell)
+
+        def get_positions(cells):
+            positions = [grid.order[start:end] for start, end in (grid.cells[cell] for cell in cells)]
+            return np.concatenate(positions) if positions else np.empty(0, dtype=grid.order.dtype)
+
+        locations = pandas.DataFrame(tdf[['lat', 'lng', 'datetime', 'tid', 'uid']])
+        rounds = [[p for p in sorted(partition_cells) if tuple(v % 2 for v in p) == parity]
+                  for parity in sorted({tuple(v % 2 for v in p) for p in partition_cells})]
+
+        clusters = []
+        worker = copy.copy(self)
+        worker.dataset = worker.anonymized_dataset = None
+        with ProcessPoolExecutor(self.n_jobs, initializer=_init_worker, initargs=(worker,)) as executor:
+            for partitions in rounds:
+                tasks = []
+                for partition in partitions:
+                    seeds = get_positions(partition_cells[partition])
+                    halo = get_positions(halo_cells.get(partition, []))
+                    positions = np.concatenate((seeds, halo))
+                    order = np.argsort(positions)
+                    positions = positions[order]
+                    alive = index.alive[positions]
+                    is_seed = (order < len(seeds))[alive]
+                    positions = positions[alive]
+                    # Partitions whose locations were all swapped by previous rounds have nothing to pick
+                    if not is_seed.any():
+                        continue
+                    tasks.append((locations.iloc[positions], positions, is_seed, partition))
+
+                for (_, positions, is_seed, _), partition_clusters in zip(tasks, executor.map(_get_clusters, tasks)):
+                    # Every location of the partition has been clustered or removed, as the swapped ones of its halo
+                    n_remaining = len(index)
+                    index.remove(positions[is_seed])
+                    for (swapped, _, _, _) in partition_clusters:
+                        index.remove(swapped[index.alive[swapped]])
+                    clusters.extend(partition_clusters)
+                    if pbar is not None:
+                        pbar.update(n_remaining - len(index))
+
+        return clusters
+
+    @staticmethod
+    def __get_swapped_tdf(tdf, clusters: list):
+        '''
+        Swapped locations of the clusters, in cluster order, with the time difference and distance to the location
+        the cluster was built from and the cluster number (starting at 1)
+        '''
+        positions, dif_time, distance, swapped_ids = (np.concatenate(values) for values in zip(*clusters))
+        sizes = [len(cluster_positions) for cluster_positions, _, _, _ in clusters]
+
+        anon_tdf = tdf.iloc[positions].reset_index(drop=True)
+        anon_tdf['dif_time'] = dif_time
+        anon_tdf['distance'] = distance
+        anon_tdf[['tid', 'uid']] = swapped_ids
+        anon_tdf['num_cluster'] = np.repeat(np.arange(1, len(clusters) + 1, dtype=np.int32), sizes)
+
+        return anon_tdf
+
     def get_anonymized_dataset(self):
         return self.anonymized_dataset
 
@@ -189,7 +327,132 @@ class SwapLocations(AnonymizationMethodInterface):
 
         step_s = data.get('step_s', None)
         step_t = data.get('step_t', None)
+        seed = data.get('seed', None)
+        n_jobs = data.get('n_jobs', 1)
 
         return SwapLocations(dataset,
                              values['k'], values['max_r_s'], values['max_r_t'], values['min_r_s'], values['min_r_t'],
-                             step_s=step_s, step_t=step_t, tile_size=values['tile_size'])
+                             step_s=step_s, step_t=step_t, tile_size=values['tile_size'], seed=seed, n_jobs=n_jobs)
+
+
+# SwapLocations clustering the partitions in the worker processes (see SwapLocations.get_clusters_by_partition)
+_swap_locations = None
+
+
+def _init_worker(swap_locations):
+    global _swap_locations
+    _swap_locations = swap_locations
+
+
+def _get_clusters(task) -> list:
+    '''
+    Swapping clusters of a partition
+    :param task: tuple with the locations of the partition and its halo (as a DataFrame), their positions within the
+                 dataset, their seed flags and the partition
+    :return: list of clusters (see SwapLocations.get_clusters), with positions within the dataset
+    '''
+    locations, positions, is_seed, partition = task
+    seed = None
+    if _swap_locations.seed is not None:
+        seed = [_swap_locations.seed] + [v % 2 ** 32 for v in partition]
+
+    index = LocationIndex(locations, _swap_locations.max_r_s, _swap_locations.max_r_t, seeds=is_seed,
+                          random_state=np.random.RandomState(seed))
+    clusters = _swap_locations.get_clusters(index, locations[['tid', 'uid']].to_numpy())
+
+    return [(positions[swapped], dif_time, distance, swapped_ids)
+            for (swapped, dif_time, distance, swapped_ids) in clusters]
+
+
+class LocationIndex:
+    '''
+    Locations of a TrajDataFrame (in tdf order), from which they are removed. Locations are referred by position and
+    indexed with:
+    - alive flags, with a Fenwick tree counting the alive ones, to pick the k-th remaining location in O(log n). Just
+      the seed locations can be picked, the rest are just candidates for the clusters of the seeds
+    - a time-sliced spatial grid (see SpatioTemporalGrid) with cells of max_r_s meters and max_r_t seconds, so the
+      locations within those radii of a location are just the ones in the adjacent cells
+    The index keeps the random generator used to pick locations (and to swap them, see SwapLocations.get_clusters).
+    '''
+
+    def __init__(self, tdf, max_r_s, max_r_t, seeds: np.ndarray = None, random_state: np.random.RandomState = None):
+        '''
+        :param tdf: TrajDataFrame (or DataFrame) with the lat, lng, tid and datetime of the locations
+        :param seeds: flags of the locations that can be picked (see choice), all of them by default
+        :param random_state: random generator, a new one (not seeded) by default
+        '''
+        self.random_state = np.random.RandomState() if random_state is None else random_state
+        self.lat = tdf['lat'].to_numpy()
+        self.lng = tdf['lng'].to_numpy()
+        self.tids = tdf['tid'].to_numpy()
+        self.datetimes = tdf['datetime'].to_numpy().astype('datetime64[ns]').astype(np.int64)
+        self.alive = np.ones(len(tdf), dtype=bool)
+        self.seeds = np.ones(len(tdf), dtype=bool) if seeds is None else np.asarray(seeds, dtype=bool)
+        self.n_alive = int(np.count_nonzero(self.seeds))
+
+        # Fenwick tree of the alive seed flags
+        self.tree = [0] + self.seeds.astype(int).tolist()
+        for i in range(1, len(self.tree)):
+            j = i + (i & -i)
+            if j < len(self.tree):
+                self.tree[j] += self.tree[i]
+
+        # Timestamps in seconds are floored, so locations within max_r_t can be max_r_t + 1 apart
+        seconds = np.floor_divide(self.datetimes, 10 ** 9)
+        self.grid = SpatioTemporalGrid(self.lng, self.lat, seconds, max_r_s, max_r_t + 1, unit=Unit.METERS)
+
+    def choice(self) -> int:
+        '''
+        Random remaining seed location: the k-th one in tdf order, with k drawn uniformly by the random generator
+        (randint over the number of remaining seed locations) and looked up in the Fenwick tree
+        '''
+        k = self.random_state.randint(self.n_alive)
+
+        # Position of the k-th alive location
+        position = 0
+        step = 1 << (len(self.tree) - 1).bit_length()
+        while step:
+            if position + step < len(self.tree) and self.tree[position + step] <= k:
+                position += step
+                k -= self.tree[position]
+            step >>= 1
+
+        return position
+
+    def get_candidates(self, position: int) -> np.ndarray:
+        '''
+        Remaining locations in the adjacent cells of the grid of a location (including itself), in tdf order
+        '''
+        candidates = self.grid.get_candidates(self.grid.x[position], self.grid.y[position],
+                                              self.grid.timestamps[position])
+
+        return np.sort(candidates[self.alive[candidates]])
+
+    def get_time_differences(self, position: int, positions: np.ndarray) -> np.ndarray:
+        '''
+        Seconds between a location and some others (as Series.dt.total_seconds)
+        '''
+        return np.abs((self.datetimes[positions] - self.datetimes[position]) / 10 ** 9)
+
+    def get_distances(self, position: int, positions: np.ndarray) -> np.ndarray:
+        '''
+        Distances (in meters) from some locations to a location
+        '''
+        return haversine_vector(np.column_stack((self.lat[positions], self.lng[positions])),
+                                np.column_stack((self.lat[[position]], self.lng[[position]])),
+                                unit=Unit.METERS, comb=True).flatten()
+
+    def remove(self, positions):
+        for position in positions:
+            self.alive[position] = False
+            if not self.seeds[position]:
+                continue
+            self.n_alive -= 1
+
+            i = position + 1
+            while i < len(self.tree):
+                self.tree[i] -= 1
+                i += i & -i
+
+    def __len__(self):
+        return self.n_alive
@@ -1,13 +1,17 @@
 import logging
 
+import numpy as np
 import pandas
-from haversine import haversine, Unit
-from more_itertools import pairwise
+from haversine import haversine, haversine_vector, Unit
 
+from mob_data_anonymizer.utils.TileSequences import TileSequences
 from mob_data_anonymizer.utils.tessellation import spatial_tessellation
 
 tessellation_shape_type = "squared"
 
+DISTANCE_TOLERANCE = 1e-9       # Relative difference between distances computed in different ways
+
+
 def apply_trajectory_anonymization (tdf, tile_size: int = 1000):
     '''
     Apply a simple trajectory anonymization method. Use when you have previously anonymized a dataset at location level.
@@ -17,25 +21,7 @@ def apply_trajectory_anonymization (tdf, tile_size: int = 1000):
     logging.info("Creating fake locations")
     # Distance between consecutive locations have to be less than tile size
     temp_tdf = tdf.sort_values(['uid', 'tid', 'datetime'])
-
-    # Copy the data of the previous locations in new columns
-    temp_tdf['p_tid'] = temp_tdf['tid'].shift(1)
-    temp_tdf['p_lng'] = temp_tdf['lng'].shift(1)
-    temp_tdf['p_lat'] = temp_tdf['lat'].shift(1)
-    temp_tdf['p_datetime'] = temp_tdf['datetime'].shift(1)
-
-    fake_locations = []
-    for index, l in temp_tdf.iterrows():
-        distance = haversine((l['lat'], l['lng']), (l['p_lat'], l['p_lng']), unit=Unit.METERS)
-        if l['tid'] == l['p_tid'] and distance >= tile_size:
-            # We create a list fake locations with just the timestamp (we interpolate the position later)
-            n_fakes = int(distance / tile_size)
-            for i in range(1, n_fakes + 1):
-                new_timestamp = l['p_datetime'] + (i * (l['datetime'] - l['p_datetime']) / (n_fakes + 1))
-                fake_locations.append([l['uid'], l['tid'], None, None, new_timestamp])
-
-    # Data frame with just the fake locations to be computed
-    fl_df = pandas.DataFrame(fake_locations, columns=['uid', 'tid', 'lng', 'lat', 'datetime'])
+    fl_df = _get_fake_locations(temp_tdf, tile_size)
 
     # Concat the original dataframe and the fake locations dataframe
     fl_tdf = pandas.concat([tdf, fl_df], axis=0, ignore_index=True)
@@ -44,81 +30,85 @@ def apply_trajectory_anonymization (tdf, tile_size: int = 1000):
     # Interpolate the missing positions
     fl_tdf[['lng', 'lat']] = fl_tdf[['lng', 'lat']].interpolate()
 
-    logging.info(f"{len(fake_locations)} new fake locations created")
+    logging.info(f"{len(fl_df)} new fake locations created")
     logging.info(f"Tessellating")
     # Tessellate both the original dataframe and the datafram with fake locations
     mfl_tdf, tessellation = spatial_tessellation(fl_tdf, tessellation_shape_type, tile_size)
     mtdf, tessellation = spatial_tessellation(tdf, tessellation_shape_type, tile_size, tessellation)
 
-    # Compute tile sequences of the tdf with fake locations
+    # Compute tile sequences of the tdf with fake locations (tiles in order of first visit, without repetitions)
     logging.info("Computing tile sequences")
-    traj_sequences = {}
-
-    for index, l in mfl_tdf.iterrows():
-        try:
-            if l['tile_ID'] not in traj_sequences[l['tid']]:
-                traj_sequences[l['tid']].append(l['tile_ID'])
-        except KeyError:
-            traj_sequences[l['tid']] = [l['tile_ID']]
+    sequences = TileSequences(mfl_tdf['tid'], mfl_tdf['tile_ID'])
+    n_tiles = len(sequences.tiles)
 
-    # Count sub_sequences ocurrences
+    # Count sub_sequences ocurrences: pairs of consecutive tiles of a trajectory, or its tile if it has just one
     logging.info("Counting pairwise occurrences")
-    subseq_count = {}
-
-    for traj_id in traj_sequences:
-        # print(traj_sequences[traj_id])
-        # print(list(more_itertools.substrings(traj_sequences[traj_id])))
-        if len(traj_sequences[traj_id]) > 1:
-            for sub_seq in pairwise(traj_sequences[traj_id]):
-                code = "_".join(sub_seq)
-                # print(code)
-                try:
-                    s = subseq_count[code][1].copy()
-                    s.add(traj_id)
-                    subseq_count[code] = (subseq_count[code][0] + 1, s)
-                except KeyError:
-                    subseq_count[code] = (1, {traj_id})
-        else:
-            code = traj_sequences[traj_id][0]
-            try:
-                s = subseq_count[code][1].copy()
-                s.add(traj_id)
-                subseq_count[code] = (subseq_count[code][0] + 1, s)
-            except KeyError:
-                subseq_count[code] = (1, {traj_id})
-
-    # We remove the locations from pairwise tiles that just appear one time
-    logging.info("Removing locations")
+    tid_codes, keys = sequences.get_bigrams()
+    unique_keys, counts, _, _ = sequences.count_bigrams()
+    n_ocurrences = counts[np.searchsorted(unique_keys, keys)]
 
-    # We iterate over the sub sequences sorted by the number of occurrences (descending). So, first, we keep all the
-    # tiles to be preserved
-    tiles_to_preserve = {}
-    for sub_seq_item in sorted(subseq_count.items(), key=lambda item: item[1][0], reverse=True):
-        sub_seq = sub_seq_item[0]
-        value = sub_seq_item[1]
-        n_ocurrences = value[0]
-        traj_ids = value[1]
-        tiles = sub_seq.split('_')
-
-        if n_ocurrences > 1:
-            # Preserve tiles of these trajectories
-            for tid in traj_ids:
-                for tile in tiles:
-                    try:
-                        tiles_to_preserve[tid].add(tile)
-                    except KeyError:
-                        tiles_to_preserve[tid] = {tile}
-        else:
-            # Remove locations if tile has not to be preserved
-            for tile in tiles:
-                tid = list(traj_ids)[0]
-                if tid not in tiles_to_preserve.keys() or tile not in tiles_to_preserve[tid]:
-                    # print(f'Removing: traj_id {tid} tile_id {tile}')
-                    # print(mtdf[(mtdf.tid == tid) & (mtdf.tile_ID == tile)].index)
-                    mtdf.drop(mtdf[(mtdf.tid == tid) & (mtdf.tile_ID == tile)].index, inplace=True)
+    # We remove the locations from pairwise tiles that just appear one time, unless the tile is preserved for the
+    # trajectory by a sub sequence appearing more times. Visits (trajectory and tile) are coded as integers
+    logging.info("Removing locations")
+    first_tiles, second_tiles = sequences.unpack_bigrams(keys)
+    visited_tiles = np.concatenate((first_tiles, second_tiles))
+    visits = np.tile(tid_codes, 2) * n_tiles + visited_tiles
+    is_preserved = np.tile(n_ocurrences > 1, 2)
+    is_tile = visited_tiles >= 0
+    removed = np.setdiff1d(visits[is_tile & ~is_preserved], visits[is_tile & is_preserved])
 
     # tessellation.to_csv("tiles.csv")
 
+    tid_codes, tile_codes = sequences.get_codes(mtdf['tid'], mtdf['tile_ID'])
+    is_removed = (tid_codes >= 0) & (tile_codes >= 0) & np.isin(tid_codes.astype(np.int64) * n_tiles + tile_codes,
+                                                                 removed)
+    mtdf = mtdf[~is_removed]
     mtdf = mtdf.drop('tile_ID', axis=1).reset_index(drop=True)
 
     return mtdf
+
+
+def _get_fake_locations(temp_tdf, tile_size: int):
+    '''
+    Fake locations (with just uid, tid and timestamp) between consecutive locations of a trajectory that are farther
+    than tile_size, evenly spaced in time. There are int(distance / tile_size) of them.
+    :param temp_tdf: tdf sorted by uid, tid and datetime
+    :return: DataFrame with the fake locations, in temp_tdf order
+    '''
+    lat = temp_tdf['lat'].to_numpy(dtype=float)
+    lng = temp_tdf['lng'].to_numpy(dtype=float)
+    tid = temp_tdf['tid'].to_numpy()
+    uid = temp_tdf['uid'].to_numpy()
+    datetimes = temp_tdf['datetime'].to_numpy().astype('datetime64[ns]').astype(np.int64)
+
+    # Distance from the previous location of the same trajectory
+    distance = np.zeros(len(temp_tdf))
+    same_trajectory = np.zeros(len(temp_tdf), dtype=bool)
+    if len(temp_tdf) > 1:
+        same_trajectory[1:] = tid[1:] == tid[:-1]
+        distance[1:] = haversine_vector(np.column_stack((lat[1:], lng[1:])), np.column_stack((lat[:-1], lng[:-1])),
+                                        unit=Unit.METERS)
+
+    # Distances close to a multiple of tile_size are computed as haversine (as the number of fakes could differ)
+    ratio = distance / tile_size
+    undecided = np.flatnonzero(same_trajectory & (ratio >= 1 - DISTANCE_TOLERANCE) &
+                               (np.abs(ratio - np.round(ratio)) <= ratio * DISTANCE_TOLERANCE))
+    for i in undecided:
+        distance[i] = haversine((lat[i], lng[i]), (lat[i - 1], lng[i - 1]), unit=Unit.METERS)
+
+    # We create a list fake locations with just the timestamp (we interpolate the position later)
+    with_fakes = np.flatnonzero(same_trajectory & (distance >= tile_size))
+    counts = (distance[with_fakes] / tile_size).astype(np.int64)
+    positions = np.repeat(with_fakes, counts)
+    n_fakes = np.repeat(counts, counts)
+    # Number of every fake location (from 1) between its two locations
+    i = np.arange(1, len(positions) + 1) - np.repeat(np.cumsum(counts) - counts, counts)
+
+    # Same operations than Timestamp + i * Timedelta / (n_fakes + 1), that truncates to nanoseconds
+    previous = datetimes[positions - 1]
+    timestamps = previous + ((i * (datetimes[positions] - previous)) / (n_fakes + 1)).astype(np.int64)
+
+    # Data frame with just the fake locations to be computed
+    return pandas.DataFrame({'uid': uid[positions].astype(np.int64), 'tid': tid[positions].astype(np.int64),
+                             'lng': np.full(len(positions), None), 'lat': np.full(len(positions), None),
+                             'datetime': timestamps.astype('datetime64[ns]')})
@@ -1,6 +1,11 @@
 import logging
+import os
 import random
+from collections import defaultdict, deque
+from concurrent.futures import ProcessPoolExecutor
+
 import numpy as np
+from sklearn.neighbors import BallTree
 from tqdm import tqdm
 
 from mob_data_anonymizer.anonymization_methods.AnonymizationMethodInterface import AnonymizationMethodInterface
@@ -12,11 +17,16 @@ DEFAULT_VALUES = {
     "temporal_thold": 30,
 }
 
+EARTH_RADIUS = 6371.0088        # Average earth radius (in kilometers) used by haversine
+DISTANCE_TOLERANCE = 1e-9       # Relative difference between distances computed in different ways
+TASK_LOCATIONS = 10000          # Minimum number of locations of the intervals sent together to a worker process
+PIPELINE_DEPTH = 4              # Tasks pending per worker process
+
 class SwapMob(AnonymizationMethodInterface):
     """Implements the SwapMob anonymization method from Julián Salas, David Megías & Vicenç Torra ( https://doi.org/10.1007/978-3-319-99771-1_22 )"""
 
     def __init__(self, dataset: Dataset, spatial_thold: float, temporal_thold: float,
-                 min_n_swaps: int = 1, seed: int = None):
+                 min_n_swaps: int = 1, seed: int = None, n_jobs: int = 1):
         """
         Parameters
         ----------
@@ -30,12 +40,17 @@ class SwapMob(AnonymizationMethodInterface):
             Minimum number of swaps for a trajectory for not being removed. (default is 1)
         seed : int, optional
             Seed for the random swapping process (default is None, so seed is not fixed)
+        n_jobs : int, optional
+            Number of worker processes computing the possible swaps of the upcoming intervals, while swaps are
+            selected and performed in order (default is 1, so no worker processes are used). -1 for all the CPUs.
+            Results do not depend on it.
         """
         self.dataset = dataset
         self.spatial_thold = spatial_thold
         self.temporal_thold = temporal_thold
         self.min_n_swaps = min_n_swaps
         self.seed = seed
+        self.n_jobs = n_jobs if n_jobs != -1 else os.cpu_count()
 
         self.anonymized_dataset = dataset.__class__()
 
@@ -60,52 +75,61 @@ class SwapMob(AnonymizationMethodInterface):
         # Get first and last timestamp of the dataset
         first_timestamp, last_timestamp = self.get_first_and_last_timestamps(np_dataset)
 
-        # Swap trajectories
-        logging.info("Swapping...")
+        # Swaps are recorded and trajectory ids (and user ids) are relabeled once at the end
+        relabeling = TrajectoryRelabeling(np_dataset)
+
+        # Get initial and end index of the locations of every interval with locations
+        intervals = []
         last_end_idx = 0
         interval_idx = 0
         ini_t = end_t = 0
-        with tqdm(total=len(np_dataset)) as pbar:
-            while end_t < last_timestamp:
-                # Get initial and final timestamps of the interval
-                ini_t = first_timestamp + interval_idx * self.temporal_thold
-                end_t = min(ini_t + self.temporal_thold, last_timestamp)
+        while end_t < last_timestamp:
+            # Get initial and final timestamps of the interval
+            ini_t = first_timestamp + interval_idx * self.temporal_thold
+            end_t = min(ini_t + self.temporal_thold, last_timestamp)
 
-                # Get initial and end index of the locations in the interval
-                locs_in_interval, ini_idx, end_idx = self.get_locs_in_interval(np_dataset, end_t, last_end_idx)
+            # Get initial and end index of the locations in the interval
+            locs_in_interval, ini_idx, end_idx = self.get_locs_in_interval(np_dataset, end_t, last_end_idx)
 
-                # Update last_end_idx for next interval get
-                last_end_idx = end_idx
+            # Update last_end_idx for next interval get
+            last_end_idx = end_idx
 
-                # If there are locations in the interval
-                if len(locs_in_interval) > 0:
-                    # Get possible swaps depending on the distance
-                    possible_swaps = self.get_possible_swaps(locs_in_interval)
+            # If there are locations in the interval
+            if len(locs_in_interval) > 0:
+                intervals.append((ini_idx, end_idx))
 
-                    # Random matching of possible swaps
-                    swaps = self.select_random_swaps(possible_swaps, locs_in_interval)
+            # Increment interval index
+            interval_idx += 1
 
-                    # Perform all swaps on np_dataset, returning also a dictionary with the number of swaps performed per trajectory
-                    performed_swaps_per_traj = self.do_swaps(np_dataset, swaps, ini_idx)
+        # Swap trajectories
+        logging.info("Swapping...")
+        with tqdm(total=len(np_dataset)) as pbar:
+            # Possible swaps do not depend on the swaps of previous intervals, so they can be computed in advance
+            all_possible_swaps = self.get_all_possible_swaps(np_dataset, intervals)
+            for (ini_idx, end_idx), possible_swaps in zip(intervals, all_possible_swaps):
+                locs_in_interval = np_dataset[ini_idx:end_idx]
 
-                    # Update swaps_per_traj_dict
-                    for (traj_id, count) in performed_swaps_per_traj.items():
-                        swaps_per_traj[traj_id] += count
+                # Random matching of possible swaps
+                swaps = self.select_random_swaps(possible_swaps, locs_in_interval)
 
-                # Increment interval index
-                interval_idx += 1
+                # Perform all swaps, returning also a dictionary with the number of swaps performed per trajectory
+                relabeling.set_interval(ini_idx, end_idx)
+                performed_swaps_per_traj = self.do_swaps(relabeling, swaps, ini_idx)
+
+                # Update swaps_per_traj_dict
+                for (traj_id, count) in performed_swaps_per_traj.items():
+                    swaps_per_traj[traj_id] += count
 
                 # Update progress bar
                 pbar.update(len(locs_in_interval))
 
+        relabeling.apply(np_dataset)
         logging.info("Swapping done!")
 
         # Remove trajectories without swaps
         logging.info("Remove trajectories without swaps")
-        for (trajectory_id, count) in swaps_per_traj.items():
-            if count < self.min_n_swaps:
-                idxs_to_preserve = np.argwhere(np_dataset[:, 3] != trajectory_id)[:, 0]
-                np_dataset = np_dataset[idxs_to_preserve, :]
+        ids_to_remove = [trajectory_id for (trajectory_id, count) in swaps_per_traj.items() if count < self.min_n_swaps]
+        np_dataset = np_dataset[~np.isin(np_dataset[:, 3], ids_to_remove)]
 
         # Transform np_dataset to the anonymized dataset
         logging.info("Transforming NumPy matrix to anonymized dataset")
@@ -212,28 +236,93 @@ class SwapMob(AnonymizationMethodInterface):
             List of possible swaps. Each value is a tuple with the location index (within locs_in_inverval array) and
             a list of the close locations indexes (also within locs_in_interval array).
         """
-        # Transform locations in interval to location objects for distance computation
-        locations = []
-        for loc in locs_in_interval:
-            locations.append(TimestampedLocation(loc[2], loc[0], loc[1]))
+        # Radius query of every location over a BallTree with the haversine metric (coordinates as lat, lng in radians)
+        coordinates = np.radians(locs_in_interval[:, [1, 0]])
+        tree = BallTree(coordinates, metric="haversine")
+        radius = self.spatial_thold / EARTH_RADIUS
+        # Slightly wider radius, pairs close to the threshold are checked below as TimestampedLocation.spatial_distance
+        neighbors, distances = tree.query_radius(coordinates, radius * (1 + DISTANCE_TOLERANCE), return_distance=True)
+
+        counts = np.array([len(n) for n in neighbors])
+        idxs1 = np.repeat(np.arange(len(locs_in_interval)), counts)
+        idxs2 = np.concatenate(neighbors).astype(int)
+        distances = np.concatenate(distances)
+
+        # Avoid comparing with the same location or another location of the trajectory
+        trajectory_ids = locs_in_interval[:, 3]
+        close = trajectory_ids[idxs1] != trajectory_ids[idxs2]
+        undecided = close & (distances >= radius * (1 - DISTANCE_TOLERANCE))
+        for k in np.flatnonzero(undecided):
+            l1 = TimestampedLocation(locs_in_interval[idxs1[k], 2], locs_in_interval[idxs1[k], 0],
+                                     locs_in_interval[idxs1[k], 1])
+            l2 = TimestampedLocation(locs_in_interval[idxs2[k], 2], locs_in_interval[idxs2[k], 0],
+                                     locs_in_interval[idxs2[k], 1])
+            close[k] = l1.spatial_distance(l2) < self.spatial_thold
+
+        # Close locations of every location, sorted by index
+        idxs1, idxs2 = idxs1[close], idxs2[close]
+        order = np.lexsort((idxs2, idxs1))
+        idxs1, idxs2 = idxs1[order], idxs2[order]
+        starts = np.flatnonzero(np.r_[True, idxs1[1:] != idxs1[:-1]]) if len(idxs1) > 0 else np.empty(0, dtype=int)
+        close_locations = np.split(idxs2, starts[1:])
 
         # Get possible swaps
-        possible_swaps = []
-        for idx1, l1 in enumerate(locations):
-            # Get close locations
-            close_locations = []
-            for idx2, l2 in enumerate(locations):
-                # If not comparing with the same location or another location of the trajectory
-                if idx1 != idx2 and locs_in_interval[idx1, 3] != locs_in_interval[idx2, 3]:
-                    # If locations are closer than the threshold
-                    if l1.spatial_distance(l2) < self.spatial_thold:
-                        close_locations.append(idx2)
-            # Add to possible_swaps
-            if len(close_locations) > 0:
-                possible_swaps.append((idx1, close_locations))
+        possible_swaps = [(idx1, locations.tolist()) for idx1, locations in
+                          zip(idxs1[starts].tolist(), close_locations)]
 
         return possible_swaps
 
+    def get_all_possible_swaps(self, np_dataset: np.array, intervals: list):
+        """Obtains the possible swaps of every interval, in order (see get_possible_swaps).
+
+        With n_jobs > 1 they are computed by worker processes, some tasks ahead of the interval being consumed.
+        Every task has consecutive intervals with TASK_LOCATIONS locations at least.
+        Trajectory ids of np_dataset must not change meanwhile (see TrajectoryRelabeling).
+
+        Parameters
+        ----------
+        np_dataset : np.array
+            NumPy array version of the dataset sorted by timestamp.
+        intervals : list
+            List of tuples with the initial and end indexes of the locations of every interval (see get_locs_in_interval).
+
+        Returns
+        -------
+        all_possible_swaps : generator
+            Possible swaps of every interval.
+        """
+        if self.n_jobs == 1:
+            for (ini_idx, end_idx) in intervals:
+                yield self.get_possible_swaps(np_dataset[ini_idx:end_idx])
+            return
+
+        # Group consecutive intervals in tasks
+        tasks = []
+        n_locations = TASK_LOCATIONS
+        for (ini_idx, end_idx) in intervals:
+            if n_locations >= TASK_LOCATIONS:
+                tasks.append([])
+                n_locations = 0
+            tasks[-1].append((ini_idx, end_idx))
+            n_locations += end_idx - ini_idx
+
+        with ProcessPoolExecutor(self.n_jobs, initializer=_init_worker,
+                                 initargs=(np_dataset, self.spatial_thold, self.temporal_thold)) as executor:
+            tasks = iter(tasks)
+            pending = deque()
+            for task in tasks:
+                pending.append(executor.submit(_get_possible_swaps, task))
+                if len(pending) == self.n_jobs * PIPELINE_DEPTH:
+                    break
+
+            while pending:
+                task_possible_swaps = pending.popleft().result()
+                task = next(tasks, None)
+                if task is not None:
+                    pending.append(executor.submit(_get_possible_swaps, task))
+
+                yield from task_possible_swaps
+
     def select_random_swaps(self, possible_swaps: list, locs_in_interval: np.array) -> list:
         """Randomly selects the swaps to perform from the possible_swaps list.
 
@@ -257,70 +346,47 @@ class SwapMob(AnonymizationMethodInterface):
         # Sort possible_swaps by number of close locations (descending) for maximizing the number of total swaps
         possible_swaps.sort(key=lambda x: len(x[1]), reverse=False)
 
+        # Trajectory ids of the locations, and the ones already swapped (not available for future swaps)
+        trajectory_ids = locs_in_interval[:, 3].tolist()
+        taken = set()
+
         # Compute swaps
         swaps = []
-        i = 0
-        while i < len(possible_swaps):
-            (idx1, close_locations) = possible_swaps[i]
+        for (idx1, close_locations) in possible_swaps:
+            # Skip possible swaps of already swapped trajectories (lazily, only when reached)
+            if trajectory_ids[idx1] in taken:
+                continue
+            close_locations = [idx for idx in close_locations if trajectory_ids[idx] not in taken]
+            if len(close_locations) == 0:
+                continue
 
             # Randomly select swapping
             idx2 = random.choice(close_locations)
 
             # Sort indexes by timestamp
             if locs_in_interval[idx1, 2] > locs_in_interval[idx2, 2]:
-                # Swap variables (idx1 <-> idx2)
-                idx1 = idx1 + idx2
-                idx2 = idx1 - idx2
-                idx1 = idx1 - idx2
+                idx1, idx2 = idx2, idx1
 
             # Add to swaps list
             swaps.append((idx1, idx2))
 
-            # Remove trajectory_ids from swaps of future possible swaps
-            id1 = locs_in_interval[idx1, 3]
-            id2 = locs_in_interval[idx2, 3]
-            j = i + 1
-            while j < len(possible_swaps):
-                (idx3, close_locations) = possible_swaps[j]
-
-                # If repeated location index or trajectory_id, remove possible swap
-                id3 = locs_in_interval[idx3, 3]
-                if idx3 == idx1 or id3 == id1 or idx3 == idx2 or id3 == id2:
-                    del possible_swaps[j]
-                    j -= 1  # Decrement index because of the removing
-                # Otherwise, try to remove from close locations list
-                else:
-                    k = 0
-                    while k < len(close_locations):
-                        idx4 = close_locations[k]
-                        id4 = locs_in_interval[idx4, 3]
-                        # If repeated location index or trajectory_id, remove close location
-                        if idx4 == idx1 or id4 == id1 or idx4 == idx2 or id4 == id2:
-                            del close_locations[k]
-                            k -= 1  # Decrement index because of the removing
-                        k += 1  # Increment index
-                    # Remove possible swap if close_locations is empty
-                    if len(close_locations) == 0:
-                        del possible_swaps[j]
-                        j -= 1  # Decrement index because of the removing
-                j += 1  # Increment index
-
-            # Increment possible swap index
-            i += 1
+            # Both trajectories are not available for future swaps
+            taken.add(trajectory_ids[idx1])
+            taken.add(trajectory_ids[idx2])
 
         return swaps
 
-    def do_swaps(self, np_dataset: np.array, swaps: list, ini_idx: int) -> dict:
+    def do_swaps(self, relabeling, swaps: list, ini_idx: int) -> dict:
         """Performs the swaps as defined in the SwapMob article.
 
         For each pair of indexes of locations from the swaps list,
         swaps the trajectory_ids (and user_ids) of all the previous locations.
-        Directly modifies the np_dataset during the swaps.
+        Swaps are recorded in relabeling, that modifies the np_dataset once at the end (see TrajectoryRelabeling).
 
         Parameters
         ----------
-        np_dataset : np.array
-            NumPy array version of the dataset. Will be modified during the method.
+        relabeling : TrajectoryRelabeling
+            Trajectory ids of np_dataset, with the current interval already set.
         swaps : list
             List of swaps returned by the select_random_swaps method.
         ini_idx : int
@@ -342,21 +408,8 @@ class SwapMob(AnonymizationMethodInterface):
             idx1 = ini_idx + raw_idx1
             idx2 = ini_idx + raw_idx2
 
-            # Get trajectory_ids and user_ids corresponding the swap
-            trajectory_id1 = np_dataset[idx1, 3]
-            user_id1 = np_dataset[idx1, 4]
-            trajectory_id2 = np_dataset[idx2, 3]
-            user_id2 = np_dataset[idx2, 4]
-
-            # Get previous indices of the trajectories
-            prev_indices_1 = np.where(np_dataset[:idx1 + 1, 3] == trajectory_id1)[0]
-            prev_indices_2 = np.where(np_dataset[:idx2 + 1, 3] == trajectory_id2)[0]
-
             # Perform swap
-            np_dataset[prev_indices_1, 3] = trajectory_id2
-            np_dataset[prev_indices_1, 4] = user_id2
-            np_dataset[prev_indices_2, 3] = trajectory_id1
-            np_dataset[prev_indices_2, 4] = user_id1
+            trajectory_id1, trajectory_id2 = relabeling.swap(idx1, idx2)
 
             # Increment number of swaps per trajectory (used in the run method for filtering)
             swaps_per_traj[trajectory_id1] = swaps_per_traj.get(trajectory_id1, 0) + 1
@@ -394,7 +447,96 @@ class SwapMob(AnonymizationMethodInterface):
 
         min_n_swaps = data.get('min_n_swaps', 1)
         seed = data.get('seed', None)
+        n_jobs = data.get('n_jobs', 1)
 
         return SwapMob(dataset,
                        values['spatial_thold'], values['temporal_thold'],
-                       min_n_swaps=min_n_swaps, seed=seed)
\ No newline at end of file
+                       min_n_swaps=min_n_swaps, seed=seed, n_jobs=n_jobs)
+
+
+# Data shared with the processes computing the possible swaps (see SwapMob.get_all_possible_swaps)
+_np_dataset = None
+_swap_mob = None
+
+
+def _init_worker(np_dataset: np.array, spatial_thold: float, temporal_thold: float):
+    global _np_dataset, _swap_mob
+    _np_dataset = np_dataset
+    _swap_mob = SwapMob(Dataset(), spatial_thold, temporal_thold)
+
+
+def _get_possible_swaps(intervals: list) -> list:
+    """Possible swaps of some intervals (tuples with the initial and end indexes of their locations)."""
+    return [_swap_mob.get_possible_swaps(_np_dataset[ini_idx:end_idx]) for (ini_idx, end_idx) in intervals]
+
+
+class TrajectoryRelabeling:
+    """Trajectory ids of the locations of a NumPy dataset sorted by timestamp, along a sequence of swaps (see
+    SwapMob.do_swaps) that are applied to the dataset once at the end.
+
+    Locations before the current interval are kept as lists of segments (arrays of positions) by current trajectory id,
+    so swapping the previous locations of two trajectories just exchanges their lists.
+    Locations of the current interval are grouped by trajectory id, and just the ones of the swapped trajectories are
+    updated. Each trajectory is swapped at most once per interval (see SwapMob.select_random_swaps), so the trajectory
+    ids of the locations of the interval are the original ones.
+    """
+
+    def __init__(self, np_dataset: np.array):
+        self.trajectory_ids = np_dataset[:, 3].copy()
+        ids, first = np.unique(self.trajectory_ids, return_index=True)
+        self.user_ids = dict(zip(ids.tolist(), np_dataset[first, 4].tolist()))
+
+        self.previous = defaultdict(list)   # Segments of the locations before the interval, by trajectory id
+        self.interval = {}                  # Positions of the locations of the interval, by trajectory id
+        self.end_idx = 0
+
+    def set_interval(self, ini_idx: int, end_idx: int):
+        # Locations of the last interval and the ones until this interval (without swaps) are previous locations
+        for groups in (self.interval, self.__group(self.end_idx, ini_idx)):
+            for trajectory_id, positions in groups.items():
+                self.previous[trajectory_id].append(positions)
+
+        self.interval = self.__group(ini_idx, end_idx)
+        self.end_idx = end_idx
+
+    def __group(self, ini_idx: int, end_idx: int) -> dict:
+        ids = self.trajectory_ids[ini_idx:end_idx]
+        order = np.argsort(ids, kind="stable")
+        sorted_ids = ids[order]
+        bounds = np.flatnonzero(sorted_ids[1:] != sorted_ids[:-1]) + 1
+        starts = np.concatenate(([0], bounds)) if len(ids) > 0 else bounds
+
+        return {trajectory_id: ini_idx + positions
+                for trajectory_id, positions in zip(sorted_ids[starts].tolist(), np.split(order, bounds))}
+
+    def swap(self, idx1: int, idx2: int) -> tuple:
+        """Swaps the trajectory ids of the locations of two trajectories until idx1 and idx2 (included).
+
+        Returns
+        -------
+        trajectory_ids : tuple
+            Trajectory ids of the locations at idx1 and idx2 before the swap.
+        """
+        trajectory_id1 = self.trajectory_ids[idx1].item()
+        trajectory_id2 = self.trajectory_ids[idx2].item()
+
+        positions1 = self.interval[trajectory_id1]
+        positions2 = self.interval[trajectory_id2]
+        self.interval[trajectory_id1] = np.sort(np.concatenate((positions2[positions2 <= idx2],
+                                                                positions1[positions1 > idx1])))
+        self.interval[trajectory_id2] = np.sort(np.concatenate((positions1[positions1 <= idx1],
+                                                                positions2[positions2 > idx2])))
+        self.previous[trajectory_id1], self.previous[trajectory_id2] = \
+            self.previous[trajectory_id2], self.previous[trajectory_id1]
+
+        return trajectory_id1, trajectory_id2
+
+    def apply(self, np_dataset: np.array):
+        """Sets the trajectory ids and user ids of np_dataset after the swaps."""
+        self.set_interval(self.end_idx, self.end_idx)
+
+        for trajectory_id, segments in self.previous.items():
+            if segments:
+                positions = np.concatenate(segments)
+                np_dataset[positions, 3] = trajectory_id
+                np_dataset[positions, 4] = self.user_ids[trajectory_id]
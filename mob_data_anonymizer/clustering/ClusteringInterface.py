@@ -1,12 +1,38 @@
 from abc import abstractmethod
 
+from mob_data_anonymizer.clustering.ClusteringListener import ClusteringListener
 from mob_data_anonymizer.entities.Trajectory import Trajectory
 
 
 class ClusteringInterface:
+    def __init__(self, listeners: list = None):
+        self.listeners = list(listeners) if listeners else []
+
     @abstractmethod
     def run(self, k: int):
         raise NotImplementedError
 
     def get_clusters(self) -> list:
         raise NotImplementedError
+
+    def add_listener(self, listener: ClusteringListener):
+        self.listeners.append(listener)
+
+    def remove_listener(self, listener: ClusteringListener):
+        self.listeners.remove(listener)
+
+    def notify_start(self, expected_clusters: int):
+        for listener in self.listeners:
+            listener.on_start(expected_clusters)
+
+    def notify_distances_computed(self, n_distances: int):
+        for listener in self.listeners:
+            listener.on_distances_computed(n_distances)
+
+    def notify_cluster_created(self, cluster_id: int, size: int):
+        for listener in self.listeners:
+            listener.on_cluster_created(cluster_id, size)
+
+    def notify_finish(self, n_clusters: int):
+        for listener in self.listeners:
+            listener.on_finish(n_clusters)
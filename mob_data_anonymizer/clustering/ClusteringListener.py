@@ -0,0 +1,67 @@
+import logging
+
+from tqdm import tqdm
+
+
+class ClusteringListener:
+    '''
+    Receives the progress events of a clustering method (see ClusteringInterface.add_listener).
+    Every event does nothing by default, so subclasses just override the events they are interested in.
+    '''
+
+    def on_start(self, expected_clusters: int):
+        pass
+
+    def on_distances_computed(self, n_distances: int):
+        pass
+
+    def on_cluster_created(self, cluster_id: int, size: int):
+        pass
+
+    def on_finish(self, n_clusters: int):
+        pass
+
+
+class ProgressBarListener(ClusteringListener):
+    '''
+    Shows a tqdm progress bar with the number of clusters created
+    '''
+
+    def __init__(self):
+        self.pbar = None
+
+    def on_start(self, expected_clusters: int):
+        self.pbar = tqdm(total=expected_clusters)
+
+    def on_cluster_created(self, cluster_id: int, size: int):
+        self.pbar.update(1)
+
+    def on_finish(self, n_clusters: int):
+        self.pbar.close()
+
+
+class LoggingListener(ClusteringListener):
+    '''
+    Logs the clustering progress every 'every' clusters created
+    '''
+
+    def __init__(self, name: str = "Clustering", every: int = 100):
+        self.name = name
+        self.every = every
+        self.expected_clusters = 0
+        self.n_distances = 0
+
+    def on_start(self, expected_clusters: int):
+        self.expected_clusters = expected_clusters
+        self.n_distances = 0
+        logging.info(f"{self.name}: started, {round(expected_clusters)} clusters expected")
+
+    def on_distances_computed(self, n_distances: int):
+        self.n_distances += n_distances
+
+    def on_cluster_created(self, cluster_id: int, size: int):
+        if (cluster_id + 1) % self.every == 0:
+            logging.info(f"{self.name}: {cluster_id + 1} of {round(self.expected_clusters)} clusters created")
+
+    def on_finish(self, n_clusters: int):
+        logging.info(f"{self.name}: finished, {n_clusters} clusters created and {self.n_distances} distances computed")
@@ -4,10 +4,8 @@ from mob_data_anonymizer.clustering.ClusteringInterface import ClusteringInterfa
 from mob_data_anonymizer.clustering.MDAV.SimpleMDAVDataset import SimpleMDAVDataset
 from mob_data_anonymizer.clustering.MDAV.interfaces.MDAVDatasetInterface import MDAVDatasetInterface
 from mob_data_anonymizer.entities.Dataset import Dataset
-import inspect
 
 from timeit import default_timer as timer
-from tqdm import tqdm
 import numpy as np
 
 
@@ -16,9 +14,11 @@ class SimpleMDAV(ClusteringInterface):
     This version of MDAV doesn't compute the centroid of unselected register every loop. It always uses the original
     centroid.
     This allows to speed the execution up.
+    Progress is reported to the listeners (see ClusteringListener), e.g. ProgressBarListener to show a progress bar.
     '''
 
-    def __init__(self, mdav_dataset: MDAVDatasetInterface):
+    def __init__(self, mdav_dataset: MDAVDatasetInterface, listeners: list = None):
+        super().__init__(listeners)
         self.mdav_dataset = mdav_dataset
         self.original_dataset = None
 
@@ -37,49 +37,44 @@ class SimpleMDAV(ClusteringInterface):
             raise Exception("k < 2, does not make sense")
 
         expected_clusters = len(self.mdav_dataset) / k
-
-        stack = inspect.stack()
-        the_class = stack[1][0].f_locals["self"].__class__.__name__
-        progress = True
-        if the_class == "TimePartMicroaggregation":
-            progress = False
+        self.notify_start(expected_clusters)
 
         # We compute the centroid just one time
         centroid = self.mdav_dataset.compute_centroid()
         logging.debug(f'Centroid: {centroid}')
-        if progress:
-            pbar = tqdm(total=expected_clusters)
         while self.mdav_dataset.unselected_length() >= 3 * k:
             # calculate r (farthest from centroid)
             farthest_r, _ = self.mdav_dataset.farthest_from(centroid)
+            self.notify_distances_computed(len(self.mdav_dataset.distances))
             # calculate s (Farthest from r)
             farthest_s, i = self.mdav_dataset.farthest_from(farthest_r)
-            self.mdav_dataset.distances = self.mdav_dataset.distances[:i]+self.mdav_dataset.distances[i+1:]
+            self.notify_distances_computed(len(self.mdav_dataset.distances))
+            self.mdav_dataset.distances = np.delete(self.mdav_dataset.distances, i)
             # create cluster with r
             self.mdav_dataset.make_cluster(farthest_r, k)
-            if progress:
-                pbar.update(1)
+            self.notify_cluster_created(self.mdav_dataset.get_num_clusters() - 1, k)
             # create cluster with s
             self.mdav_dataset.calculate_distances(farthest_s)
+            self.notify_distances_computed(len(self.mdav_dataset.distances))
             self.mdav_dataset.make_cluster(farthest_s, k)
-            if progress:
-                pbar.update(1)
+            self.notify_cluster_created(self.mdav_dataset.get_num_clusters() - 1, k)
 
         logging.debug(f'Unselected_length: {self.mdav_dataset.unselected_length()}')
         if self.mdav_dataset.unselected_length() >= 2 * k:
             # calculate r (farthest from centroid)
             farthest_r, _ = self.mdav_dataset.farthest_from(centroid)
+            self.notify_distances_computed(len(self.mdav_dataset.distances))
             self.mdav_dataset.calculate_distances(farthest_r)
+            self.notify_distances_computed(len(self.mdav_dataset.distances))
             # create cluster with r
             self.mdav_dataset.make_cluster(farthest_r, k)
-            if progress:
-                pbar.update(1)
+            self.notify_cluster_created(self.mdav_dataset.get_num_clusters() - 1, k)
 
+        size = self.mdav_dataset.unselected_length()
         self.mdav_dataset.make_cluster_unselected()
         # logging.info("\tLast cluster made!")
-        if progress:
-            pbar.update(1)
-            pbar.close()
+        self.notify_cluster_created(self.mdav_dataset.get_num_clusters() - 1, size)
+        self.notify_finish(self.mdav_dataset.get_num_clusters())
 
     def get_clusters(self) -> list:
         clusters = {}
@@ -66,7 +66,7 @@ class SimpleMDAVDataset(MDAVDatasetInterface):
         return farthest, index
 
     def calculate_distances(self, traj: Trajectory):
-        self.distances = [self.distance.compute(traj, t) for t in self.trajectories_elegible]
+        self.distances = self.distance.compute_one_to_many(traj, self.trajectories_elegible)
 
     def unselected_length(self):
         return len(self.trajectories_elegible)
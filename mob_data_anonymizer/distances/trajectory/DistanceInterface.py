@@ -1,5 +1,7 @@
 from abc import abstractmethod, ABC
 
+import numpy as np
+
 from mob_data_anonymizer.entities.Trajectory import Trajectory
 
 
@@ -8,6 +10,29 @@ class DistanceInterface(ABC):
     def compute(self, trajectory1: Trajectory, trajectory2: Trajectory) -> float:
         raise NotImplementedError
 
+    def compute_one_to_many(self, trajectory: Trajectory, trajectories) -> np.ndarray:
+        '''
+        Compute the distance from a trajectory to every trajectory of a block.
+        By default compute is called for every pair, subclasses override it with vectorized versions when possible.
+        :param trajectory: trajectory
+        :param trajectories: list (or array) of trajectories
+        :return: array of distances, NaN when the distance is not defined (None)
+        '''
+        return np.array([self.compute(trajectory, t) for t in trajectories], dtype=float).reshape(len(trajectories))
+
+    def compute_pairwise(self, block_a, block_b) -> np.ndarray:
+        '''
+        Compute the distance between every pair of trajectories of two blocks, one row per trajectory of block_a.
+        :param block_a: list (or array) of trajectories
+        :param block_b: list (or array) of trajectories
+        :return: matrix of distances (len(block_a) x len(block_b)), NaN when the distance is not defined (None)
+        '''
+        distances = np.empty((len(block_a), len(block_b)))
+        for i, trajectory in enumerate(block_a):
+            distances[i] = self.compute_one_to_many(trajectory, block_b)
+
+        return distances
+
     @abstractmethod
     def filter_dataset(self):
         raise NotImplementedError
@@ -13,9 +13,14 @@ from mob_data_anonymizer.distances.trajectory.DistanceInterface import DistanceI
 
 class Distance(DistanceInterface):
 
-    def __init__(self, dataset: Dataset):
+    def __init__(self, dataset: Dataset, n_jobs: int = 1, backend: str = 'networkx'):
+        '''
+        :param dataset: dataset
+        :param n_jobs: number of processes computing the distance graph (-1 for all the CPUs)
+        :param backend: storage of the distance graph, 'networkx' or 'scipy' (see DistanceGraph)
+        '''
         self.dataset = dataset
-        self.distance_graph = DistanceGraph(dataset)
+        self.distance_graph = DistanceGraph(dataset, n_jobs=n_jobs, backend=backend)
         self.distance_graph.compute()
         # self.distance_matrix = self.__compute_distance_matrix()
         self.distance_matrix = defaultdict(dict)
@@ -113,6 +118,34 @@ class Distance(DistanceInterface):
 
         return d
 
+    def compute_one_to_many(self, trajectory: Trajectory, trajectories) -> np.ndarray:
+        distances = np.empty(len(trajectories))
+        if not self.distance_graph.is_included(trajectory.id):
+            self.distance_graph.add_node(trajectory)
+
+        # Distances not computed yet between nodes of the distance graph are taken from the graph at once
+        computed = self.distance_matrix[trajectory.id]
+        pending = []
+        for pos, t in enumerate(trajectories):
+            if t.id in computed:
+                d = computed[t.id]
+            elif self.distance_graph.is_included(t.id):
+                pending.append(pos)
+                continue
+            else:
+                d = self.compute(trajectory, t)
+            distances[pos] = d if d is not None else np.nan
+
+        pending_ids = [trajectories[pos].id for pos in pending]
+        for pos, t_id, d in zip(pending, pending_ids, self.distance_graph.get_graph_distances(trajectory.id,
+                                                                                             pending_ids)):
+            # Store the distance for later use
+            self.distance_matrix[trajectory.id][t_id] = d
+            self.distance_matrix[t_id][trajectory.id] = d
+            distances[pos] = d if d is not None else np.nan
+
+        return distances
+
     '''
     Return a new dataset with the trajectories of the main connected component of the distance graph
     '''
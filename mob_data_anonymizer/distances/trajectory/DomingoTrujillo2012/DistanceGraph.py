@@ -1,21 +1,48 @@
 import logging
 import math
+import os
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+
 import networkx as nx
+import numpy as np
 import matplotlib.pyplot as plt
+from scipy.sparse.csgraph import shortest_path
 
+from mob_data_anonymizer.distances.trajectory.DomingoTrujillo2012.SparseGraph import SparseGraph
+from mob_data_anonymizer.distances.trajectory.DomingoTrujillo2012.SynchronizedTrajectory import SynchronizedTrajectory
 from mob_data_anonymizer.distances.trajectory.DomingoTrujillo2012.TrajectoryUtils import get_p_contemporary, get_overlap_time
+from mob_data_anonymizer.distances.trajectory.TemporalIndex import TemporalIndex
 from mob_data_anonymizer.entities.Dataset import Dataset
-from mob_data_anonymizer.entities.TimestampedLocation import TimestampedLocation
 from mob_data_anonymizer.entities.Trajectory import Trajectory
-from mob_data_anonymizer.utils.Interpolation import interpolate
 
 
 class DistanceGraph:
-    def __init__(self, dataset: Dataset = None):
+    def __init__(self, dataset: Dataset = None, n_jobs: int = 1, cached_rows: int = 1024, backend: str = 'networkx'):
+        '''
+        :param dataset: dataset
+        :param n_jobs: number of processes computing the edges of the graph (-1 for all the CPUs)
+        :param cached_rows: number of sources whose shortest path lengths to every node are kept (see
+                            get_graph_distance)
+        :param backend: graph storage, 'networkx' or 'scipy' (CSR matrix, see SparseGraph) for large graphs
+        '''
         if dataset and dataset.is_loaded():
             self.dataset = dataset
 
-        self.graph = nx.Graph()
+        self.n_jobs = n_jobs if n_jobs != -1 else os.cpu_count()
+        if backend == 'networkx':
+            self.graph = nx.Graph()
+        elif backend == 'scipy':
+            self.graph = SparseGraph()
+        else:
+            raise Exception(f"Unknown graph backend: {backend}")
+        self.backend = backend
+
+        # Shortest path lengths, cleared every time the graph changes
+        self.cached_rows = cached_rows
+        self.shortest_paths = OrderedDict()         # Lengths from the last sources, one row per node (see node_index)
+        self.shortest_paths_matrix = None           # Lengths between all the nodes (see compute_shortest_paths)
+        self.node_index = None
 
     def compute(self):
         logging.info("Computing distance graph")
@@ -33,139 +60,94 @@ class DistanceGraph:
         logging.info("Distance graph computed!")
 
     def __synchronize_trajectories(self):
-        # Collect all timestamps
-        timestamps = []
-        for T in self.dataset.trajectories:
-            for L in T.locations:
-                timestamps.append(L.timestamp)
-
-        # Converting to set we remove duplicates
-        timestamps = list(set(timestamps))
-        timestamps.sort()
+        # Collect all timestamps (sorted and without duplicates)
+        self.timestamps = np.unique(np.fromiter((L.timestamp for T in self.dataset.trajectories for L in T.locations),
+                                                dtype=np.int64))
 
+        self.trajectories = {}
         self.synchronyzed_trajectories = []
+        self.synchronized_by_id = {}
         for T_i in self.dataset.trajectories:
-            synchro_T = self.__synchronize_trajectory(T_i, timestamps)
+            self.trajectories[T_i.id] = T_i
+            synchro_T = SynchronizedTrajectory.synchronize(T_i, self.timestamps)
             self.synchronyzed_trajectories.append(synchro_T)
-            # logging.debug(f'Trajectory {T_i.id} synchronized!')
+            self.synchronized_by_id[synchro_T.id] = synchro_T
 
-        # logging.debug(self.synchronyzed_trajectories)
+        # Lifespan of every synchronized trajectory
+        self.temporal_index = TemporalIndex(self.synchronyzed_trajectories)
 
     def __get_synchro_trajectory(self, id):
-        for t in self.synchronyzed_trajectories:
-            if t.id == id:
-                return t
-        return None
-
-    def __synchronize_trajectory(self, T: Trajectory, timestamps):
-
-        synchro_T = Trajectory(T.id)
-        filter_timestamps = [t for t in timestamps if (T.get_first_timestamp() <= t <= T.get_last_timestamp())]
-        for ts in filter_timestamps:
-            loc = T.get_location_by_timestamp(ts)
-            if loc:
-                synchro_T.add_location(loc)
-            else:
-                # Interpolate
-                prev_loc = T.get_previous_location_by_timestamp(ts)
-                next_loc = T.get_next_location_by_timestamp(ts)
-                point = interpolate(prev_loc, next_loc, ts)
-                interpolated_location = TimestampedLocation(ts, round(point[0], 6), round(point[1], 6))
-                synchro_T.add_location(interpolated_location)
-
-        return synchro_T
+        return self.synchronized_by_id.get(id)
 
     def __resynchronize_trajectories(self, new_t: Trajectory):
         if not self.synchronyzed_trajectories:
             raise Exception("Dataset trajectories must already be synchronized")
 
-        # Collect previous timestamps
-        timestamps = []
-        for T in self.synchronyzed_trajectories:
-            for L in T.locations:
-                timestamps.append(L.timestamp)
+        # Just the new timestamps have to be added to the trajectories whose lifespan includes them
+        new_timestamps = np.setdiff1d([L.timestamp for L in new_t.locations], self.timestamps)
+        updated = []
+        if len(new_timestamps) > 0:
+            included = (np.searchsorted(new_timestamps, self.temporal_index.ends, side='right') -
+                        np.searchsorted(new_timestamps, self.temporal_index.starts, side='left'))
+            updated = np.flatnonzero(included)
+            for i in updated:
+                synchro_T = self.synchronyzed_trajectories[i]
+                synchro_T.add_timestamps(self.trajectories[synchro_T.id], new_timestamps)
 
-        # And the new ones
-        for L in new_t.locations:
-            timestamps.append(L.timestamp)
-
-        # Converting to set we remove duplicates
-        timestamps = list(set(timestamps))
-        timestamps.sort()
-
-        # TODO: Estamos resynchronizando todos los timestamps de todas las trayectorías.
-        #       En realidad, solo haría falta calcular los nuevos timestamps
-        self.synchronyzed_trajectories = []
-        for T_i in self.dataset.trajectories:
-            synchro_T = self.__synchronize_trajectory(T_i, timestamps)
-            self.synchronyzed_trajectories.append(synchro_T)
-            # logging.debug(f'Trajectory {T_i.id} resynchronized!')
+            self.timestamps = np.union1d(self.timestamps, new_timestamps)
 
         # Finally add the synchronized new trajectory
-        synchro_T = self.__synchronize_trajectory(new_t, timestamps)
+        synchro_T = SynchronizedTrajectory.synchronize(new_t, self.timestamps)
+        self.trajectories[new_t.id] = new_t
         self.synchronyzed_trajectories.append(synchro_T)
+        self.synchronized_by_id[synchro_T.id] = synchro_T
+        self.temporal_index.add(synchro_T)
 
-        logging.info("\tTrajectories re-synchronized")
+        logging.info(f"\tTrajectories re-synchronized ({len(updated)} updated)")
 
     def get_distance(self, s_traj_1, s_traj_2):
 
-        if not isinstance(s_traj_1, Trajectory):
+        if not isinstance(s_traj_1, (Trajectory, SynchronizedTrajectory)):
             id = s_traj_1
             s_traj_1 = self.__get_synchro_trajectory(s_traj_1)
             if s_traj_1 is None:
                 raise Exception(f"Trajectory {id} doesn't exist")
-        if not isinstance(s_traj_2, Trajectory):
+        if not isinstance(s_traj_2, (Trajectory, SynchronizedTrajectory)):
             id = s_traj_2
             s_traj_2 = self.__get_synchro_trajectory(s_traj_2)
             if s_traj_2 is None:
                 raise Exception(f"Trajectory {id} doesn't exist")
 
-        p = get_p_contemporary(s_traj_1, s_traj_2)
-        # logging.debug(f'\tp-contemporary: {p}')
-        if p > 0:
-            # p-contemporanies
-            ot = get_overlap_time(s_traj_1, s_traj_2)
-            # logging.debug(f'\tot: {ot}')
-            ts_interval = s_traj_1.get_interval_timestamps(ot)
-            # logging.debug(f'\tts_interval length: {len(ts_interval)}')
-
-            d = 0
-            denominator = pow(max(ot) - min(ot), 2)
-            for ts in ts_interval:
-                loc_1 = s_traj_1.get_location_by_timestamp(ts)
-                loc_2 = s_traj_2.get_location_by_timestamp(ts)
-                d += (pow(loc_1.x - loc_2.x, 2) + pow(loc_1.y - loc_2.y, 2)) / denominator
-
-            d = math.sqrt(d)
-            d = d / p
-
-            return d
-        else:
-            return None
+        return get_synchronized_distance(s_traj_1, s_traj_2)
 
     def __build_graph(self):
 
         # Add nodes
         self.graph.add_nodes_from([t.id for t in self.synchronyzed_trajectories])
 
-        for T_i in self.synchronyzed_trajectories:
-            for T_j in self.synchronyzed_trajectories:
-                # logging.debug(f'Computing distance ({T_i.id, T_j.id})')
-                if T_i != T_j:
-                    # Check if an edge between T_i and T_l already exists
-                    if T_j.id not in self.graph.nodes() or T_i.id not in list(self.graph.neighbors(T_j.id)):
-                        # logging.debug(f'\tActually computing ({T_i.id, T_j.id})')
-                        d = self.get_distance(T_i, T_j)
-                        # logging.debug(f'\td =  {d}')
-                        if d is not None:
-                            self.graph.add_edge(T_i.id, T_j.id, weight=d)
+        # Only trajectories overlapping in time can be p-contemporary, every overlapping pair is visited once
+        order, last_overlapping = self.temporal_index.get_sweep()
+        sweep = (self.synchronyzed_trajectories, order, last_overlapping, self.temporal_index.starts,
+                 self.temporal_index.ends)
+
+        if self.n_jobs == 1:
+            edges = _compute_edges(range(len(order)), sweep)
+        else:
+            # Trajectories are dealt in turns, so every chunk has trajectories with both few and many overlaps
+            chunks = [range(c, len(order), self.n_jobs * 4) for c in range(self.n_jobs * 4)]
+            with ProcessPoolExecutor(self.n_jobs, initializer=_init_sweep, initargs=(sweep,)) as executor:
+                edges = [e for chunk_edges in executor.map(_compute_edges, chunks) for e in chunk_edges]
+
+        ids = [t.id for t in self.synchronyzed_trajectories]
+        self.graph.add_weighted_edges_from((ids[i], ids[j], d) for i, j, d in edges)
 
     def draw_graph(self):
-        pos = nx.spring_layout(self.graph)
+        graph = self.graph if self.backend == 'networkx' else self.graph.to_networkx()
+        pos = nx.spring_layout(graph)
         plt.figure()
-        nx.draw(self.graph, pos, with_labels=True, font_weight='bold', node_color="white", edgecolors="black")
-        edge_labels = nx.get_edge_attributes(self.graph, 'weight')
-        nx.draw_networkx_edge_labels(self.graph, pos, edge_labels=edge_labels, font_color='red')
+        nx.draw(graph, pos, with_labels=True, font_weight='bold', node_color="white", edgecolors="black")
+        edge_labels = nx.get_edge_attributes(graph, 'weight')
+        nx.draw_networkx_edge_labels(graph, pos, edge_labels=edge_labels, font_color='red')
 
         plt.show()
 
@@ -183,13 +165,104 @@ class DistanceGraph:
         if self.graph.get_edge_data(s_traj_1.id, s_traj_2.id):
             return self.graph[s_traj_1.id][s_traj_2.id]["weight"]
 
-        return nx.shortest_path_length(self.graph, s_traj_1.id, s_traj_2.id, "weight")
+        d = self.__get_shortest_path_length(s_traj_1.id, s_traj_2.id)
+        if np.isinf(d):
+            raise nx.NetworkXNoPath(f"No path between {s_traj_1.id} and {s_traj_2.id}.")
+
+        return d.item()
+
+    def get_graph_distances(self, t_id, targets: list) -> list:
+        '''
+        Graph distance (see get_graph_distance) from a node to a list of nodes. The shortest paths from t_id are
+        computed just once, if needed.
+        :param t_id: id of the trajectory
+        :param targets: ids of the trajectories
+        :return: list of distances, None when there is no path
+        '''
+        neighbors = self.graph[t_id]
+        lengths = None
+        distances = []
+        for target in targets:
+            if target in neighbors:
+                distances.append(neighbors[target]["weight"])
+            else:
+                if lengths is None:
+                    lengths = self.__get_shortest_paths(t_id)
+                d = lengths[self.node_index[target]]
+                distances.append(d.item() if not np.isinf(d) else None)
+
+        return distances
+
+    def compute_shortest_paths(self, dtype=np.float32):
+        '''
+        Compute the shortest path lengths between all the nodes at once (with SciPy), so later graph distances are
+        just looked up. It takes n² values of memory, float32 by default to halve it.
+        :param dtype: type of the stored lengths
+        '''
+        logging.info("Computing shortest paths")
+        self.__index_nodes()
+        if self.backend == 'scipy':
+            lengths = self.graph.all_shortest_paths()
+        else:
+            matrix = nx.to_scipy_sparse_array(self.graph, nodelist=list(self.node_index), weight="weight",
+                                              format="csr")
+            lengths = shortest_path(matrix, method="D", directed=False)
+        self.shortest_paths_matrix = lengths.astype(dtype)
+        self.shortest_paths.clear()
+        logging.info("Shortest paths computed!")
+
+    def __index_nodes(self):
+        if self.node_index is None:
+            if self.backend == 'scipy':
+                self.node_index = self.graph.node_index
+            else:
+                self.node_index = {t_id: i for i, t_id in enumerate(self.graph.nodes)}
+
+    def __clear_shortest_paths(self):
+        self.shortest_paths.clear()
+        self.shortest_paths_matrix = None
+        self.node_index = None
+
+    def __get_shortest_path_length(self, source, target) -> float:
+        # The graph is undirected, the lengths from the target are used if they are already known
+        if target in self.shortest_paths and source not in self.shortest_paths:
+            source, target = target, source
+
+        return self.__get_shortest_paths(source)[self.node_index[target]]
+
+    def __get_shortest_paths(self, source) -> np.ndarray:
+        '''
+        Shortest path lengths from a node to every node (see node_index), inf if there is no path
+        '''
+        self.__index_nodes()
+        if self.shortest_paths_matrix is not None:
+            return self.shortest_paths_matrix[self.node_index[source]]
+
+        try:
+            self.shortest_paths.move_to_end(source)
+            return self.shortest_paths[source]
+        except KeyError:
+            if self.backend == 'scipy':
+                row = self.graph.shortest_paths_from(source)
+            else:
+                lengths = nx.single_source_dijkstra_path_length(self.graph, source, weight="weight")
+                row = np.full(len(self.node_index), np.inf)
+                row[[self.node_index[t_id] for t_id in lengths]] = list(lengths.values())
+
+            self.shortest_paths[source] = row
+            if len(self.shortest_paths) > self.cached_rows:
+                self.shortest_paths.popitem(last=False)
+
+            return row
 
     def get_components(self):
+        if self.backend == 'scipy':
+            return self.graph.connected_components()
+
         return nx.connected_components(self.graph)
 
     def get_large_component(self):
-        return max(nx.connected_components(self.graph), key=len)
+        return max(self.get_components(), key=len)
 
     def is_included(self, t_id):
         return t_id in self.graph
@@ -200,14 +273,80 @@ class DistanceGraph:
         # Synchronize
         self.__resynchronize_trajectories(t)
 
+        self.__clear_shortest_paths()
         self.graph.add_node(t.id)
 
-        for T_i in self.synchronyzed_trajectories:
-            d = self.get_distance(t, T_i)
-            if d is not None:
-                self.graph.add_edge(t.id, T_i.id, weight=d)
+        # Only trajectories overlapping in time can be p-contemporary
+        for i in self.temporal_index.get_overlapping(t.get_first_timestamp(), t.get_last_timestamp()):
+            T_i = self.synchronyzed_trajectories[i]
+            if T_i.id != t.id:
+                d = self.get_distance(t, T_i)
+                if d is not None:
+                    self.graph.add_edge(t.id, T_i.id, weight=d)
 
         logging.info(f"New node added: {t.id}")
 
     def get_nodes(self):
         return self.graph.nodes
+
+
+def get_synchronized_distance(s_traj_1, s_traj_2):
+    '''
+    Distance between two synchronized trajectories (see DistanceGraph.get_distance)
+    :return: distance, None if the trajectories are not p-contemporary
+    '''
+    p = get_p_contemporary(s_traj_1, s_traj_2)
+    # logging.debug(f'\tp-contemporary: {p}')
+    if p > 0:
+        # p-contemporanies
+        if isinstance(s_traj_1, Trajectory):
+            s_traj_1 = SynchronizedTrajectory.from_trajectory(s_traj_1)
+        if isinstance(s_traj_2, Trajectory):
+            s_traj_2 = SynchronizedTrajectory.from_trajectory(s_traj_2)
+
+        ot = get_overlap_time(s_traj_1, s_traj_2)
+        # logging.debug(f'\tot: {ot}')
+        interval = s_traj_1.get_interval(ot)
+        # Locations of the second trajectory at the same timestamps
+        pos_2 = np.searchsorted(s_traj_2.timestamps, s_traj_1.timestamps[interval])
+
+        denominator = pow(max(ot) - min(ot), 2)
+        d = np.sum((np.square(s_traj_1.x[interval] - s_traj_2.x[pos_2]) +
+                    np.square(s_traj_1.y[interval] - s_traj_2.y[pos_2])) / denominator)
+
+        d = math.sqrt(d)
+        d = d / p
+
+        return d
+    else:
+        return None
+
+
+# Data shared with the processes building the graph edges (see DistanceGraph.__build_graph)
+_sweep = None
+
+
+def _init_sweep(sweep):
+    global _sweep
+    _sweep = sweep
+
+
+def _compute_edges(positions, sweep=None) -> list:
+    '''
+    Edges of the trajectories at some positions of the sweep (ordered by start timestamp) with the following
+    trajectories overlapping in time
+    :return: list of edges (position, position, distance) with positions within the list of synchronized trajectories
+    '''
+    trajectories, order, last_overlapping, starts, ends = sweep if sweep is not None else _sweep
+
+    edges = []
+    for k in positions:
+        i = order[k]
+        for j in order[k + 1:last_overlapping[k]]:
+            # A trajectory without duration (single timestamp) is not p-contemporary to any other
+            if ends[j] > starts[j]:
+                d = get_synchronized_distance(trajectories[i], trajectories[j])
+                if d is not None:
+                    edges.append((i, j, d))
+
+    return edges
@@ -0,0 +1,128 @@
+import networkx as nx
+import numpy as np
+from scipy.sparse import coo_matrix
+from scipy.sparse.csgraph import connected_components, dijkstra, shortest_path
+
+
+class SparseGraph:
+    '''
+    Undirected weighted graph stored as a SciPy CSR matrix (see DistanceGraph, backend='scipy').
+    It implements the part of the networkx.Graph interface used by DistanceGraph, with the graph algorithms of
+    scipy.sparse.csgraph. Every edge takes two entries of the matrix (12 bytes each) instead of the dicts of networkx.
+    Nodes are indexed in insertion order. Edges are expected to be added once.
+    '''
+
+    def __init__(self):
+        self.node_index = {}
+        self.node_ids = []
+
+        self.csr = coo_matrix((0, 0)).tocsr()
+        # Edges added since the matrix was built, they are merged the next time it is needed
+        self.pending_edges = []
+
+    def add_node(self, t_id):
+        if t_id not in self.node_index:
+            self.node_index[t_id] = len(self.node_ids)
+            self.node_ids.append(t_id)
+
+    def add_nodes_from(self, ids):
+        for t_id in ids:
+            self.add_node(t_id)
+
+    def add_edge(self, u, v, weight):
+        self.add_weighted_edges_from([(u, v, weight)])
+
+    def add_weighted_edges_from(self, edges):
+        for u, v, weight in edges:
+            self.add_node(u)
+            self.add_node(v)
+            self.pending_edges.append((self.node_index[u], self.node_index[v], weight))
+
+    def get_csr(self):
+        '''
+        Symmetric CSR matrix with the weights of the edges. Zero weights are kept as explicit entries.
+        '''
+        n = len(self.node_ids)
+        if self.pending_edges or self.csr.shape[0] != n:
+            current = self.csr.tocoo()
+            rows, cols, weights = [current.row], [current.col], [current.data]
+            if self.pending_edges:
+                new_rows, new_cols, new_weights = (np.array(values) for values in zip(*self.pending_edges))
+                rows += [new_rows, new_cols]
+                cols += [new_cols, new_rows]
+                weights += [new_weights, new_weights]
+
+            self.csr = coo_matrix((np.concatenate(weights), (np.concatenate(rows), np.concatenate(cols))),
+                                  shape=(n, n)).tocsr()
+            self.pending_edges = []
+
+        return self.csr
+
+    def get_neighbors(self, t_id) -> dict:
+        '''
+        Weight of the edges of a node, by neighbor id
+        '''
+        csr = self.get_csr()
+        i = self.node_index[t_id]
+        start, end = csr.indptr[i], csr.indptr[i + 1]
+
+        return {self.node_ids[j]: w for j, w in zip(csr.indices[start:end].tolist(), csr.data[start:end].tolist())}
+
+    def get_edge_data(self, u, v):
+        neighbors = self.get_neighbors(u)
+        if v in neighbors:
+            return {"weight": neighbors[v]}
+
+        return None
+
+    def __getitem__(self, t_id):
+        return {v: {"weight": w} for v, w in self.get_neighbors(t_id).items()}
+
+    def __contains__(self, t_id):
+        return t_id in self.node_index
+
+    @property
+    def nodes(self):
+        return self.node_index.keys()
+
+    def has_edge(self, u, v):
+        return u in self.node_index and v in self.node_index and self.get_edge_data(u, v) is not None
+
+    def number_of_nodes(self):
+        return len(self.node_ids)
+
+    def number_of_edges(self):
+        return self.get_csr().nnz // 2
+
+    def edges(self, data=False):
+        csr = self.get_csr().tocoo()
+        upper = csr.row < csr.col
+        for i, j, w in zip(csr.row[upper].tolist(), csr.col[upper].tolist(), csr.data[upper].tolist()):
+            if data:
+                yield self.node_ids[i], self.node_ids[j], w
+            else:
+                yield self.node_ids[i], self.node_ids[j]
+
+    def shortest_paths_from(self, t_id) -> np.ndarray:
+        '''
+        Shortest path lengths from a node to every node (by index), inf if there is no path
+        '''
+        return dijkstra(self.get_csr(), directed=False, indices=self.node_index[t_id])
+
+    def all_shortest_paths(self) -> np.ndarray:
+        return shortest_path(self.get_csr(), method="D", directed=False)
+
+    def connected_components(self):
+        _, labels = connected_components(self.get_csr(), directed=False)
+        components = {}
+        for t_id, label in zip(self.node_ids, labels.tolist()):
+            components.setdefault(label, set()).add(t_id)
+
+        return iter(components.values())
+
+    def to_networkx(self) -> nx.Graph:
+        graph = nx.Graph()
+        graph.add_nodes_from(self.node_ids)
+        graph.add_weighted_edges_from(self.edges(data=True))
+
+        return graph
@@ -0,0 +1,124 @@
+import numpy as np
+
+from mob_data_anonymizer.entities.Trajectory import Trajectory
+
+
+class SynchronizedTrajectory:
+    '''
+    Trajectory synchronized to a set of timestamps: it has a location for every timestamp within its lifespan.
+    Locations are stored as arrays (timestamps, x and y) sorted by timestamp.
+    '''
+
+    def __init__(self, id, timestamps: np.ndarray, x: np.ndarray, y: np.ndarray):
+        self.id = id
+        self.timestamps = timestamps
+        self.x = x
+        self.y = y
+
+    @staticmethod
+    def from_trajectory(T: Trajectory):
+        '''
+        Convert a trajectory to arrays as it is, without synchronizing it
+        '''
+        ts = np.array([l.timestamp for l in T.locations], dtype=np.int64)
+        x = np.array([l.x for l in T.locations])
+        y = np.array([l.y for l in T.locations])
+
+        return SynchronizedTrajectory(T.id, ts, x, y)
+
+    @staticmethod
+    def synchronize(T: Trajectory, timestamps: np.ndarray):
+        '''
+        Synchronize a trajectory to a set of timestamps. Locations at timestamps of the trajectory are kept and the
+        rest of timestamps within its lifespan are linearly interpolated (see utils.Interpolation)
+        :param T: trajectory
+        :param timestamps: sorted array of unique timestamps
+        :return: synchronized trajectory
+        '''
+        return SynchronizedTrajectory.from_trajectory(T).resample(timestamps)
+
+    def resample(self, timestamps: np.ndarray):
+        '''
+        Locations of the trajectory at a set of timestamps (see synchronize), from the current ones
+        :param timestamps: sorted array of unique timestamps
+        :return: synchronized trajectory
+        '''
+        ts, x, y = self.get_arrays()
+
+        # Timestamps within the lifespan of the trajectory
+        start = timestamps.searchsorted(ts[0], side='left')
+        end = timestamps.searchsorted(ts[-1], side='right')
+        synchro_ts = timestamps[start:end]
+
+        # Position of every timestamp within the trajectory. The first one is taken if the timestamp is repeated
+        pos = ts.searchsorted(synchro_ts, side='left')
+        found = ts[np.minimum(pos, len(ts) - 1)] == synchro_ts
+        if found.all():
+            return SynchronizedTrajectory(self.id, synchro_ts, x[pos], y[pos])
+
+        synchro_x = np.empty(len(synchro_ts))
+        synchro_y = np.empty(len(synchro_ts))
+        synchro_x[found] = x[pos[found]]
+        synchro_y[found] = y[pos[found]]
+
+        # Interpolate between the previous and the next location (same operations than utils.Interpolation)
+        missing = ~found
+        prev_pos = pos[missing] - 1
+        next_pos = pos[missing]
+        t = (synchro_ts[missing] - ts[prev_pos]) / (ts[next_pos] - ts[prev_pos])
+        interpolated_x = (1 - t) * x[prev_pos] + t * x[next_pos]
+        interpolated_y = (1 - t) * y[prev_pos] + t * y[next_pos]
+        # Python round (correctly rounded) instead of np.round, that differs in some halfway cases
+        synchro_x[missing] = [round(v, 6) for v in interpolated_x.tolist()]
+        synchro_y[missing] = [round(v, 6) for v in interpolated_y.tolist()]
+
+        return SynchronizedTrajectory(self.id, synchro_ts, synchro_x, synchro_y)
+
+    def add_timestamps(self, T: Trajectory, timestamps: np.ndarray):
+        '''
+        Synchronize the trajectory to new timestamps, keeping the previous ones
+        :param T: original (not synchronized) trajectory
+        :param timestamps: sorted array of unique timestamps not included yet
+        '''
+        new = SynchronizedTrajectory.synchronize(T, timestamps)
+        pos = np.searchsorted(self.timestamps, new.timestamps)
+        self.timestamps = np.insert(self.timestamps, pos, new.timestamps)
+        self.x = np.insert(self.x, pos, new.x)
+        self.y = np.insert(self.y, pos, new.y)
+
+    def get_arrays(self) -> tuple:
+        return self.timestamps, self.x, self.y
+
+    def get_first_timestamp(self):
+        return int(self.timestamps[0])
+
+    def get_last_timestamp(self):
+        return int(self.timestamps[-1])
+
+    def get_timestamps(self):
+        return self.timestamps.tolist()
+
+    def get_interval(self, interval: tuple) -> slice:
+        '''
+        Positions of the locations within a time interval (both ends included)
+        '''
+        start = self.timestamps.searchsorted(interval[0], side='left')
+        end = self.timestamps.searchsorted(interval[1], side='right')
+
+        return slice(start, end)
+
+    def __len__(self):
+        return len(self.timestamps)
+
+    def __str__(self):
+        string = f"T {self.id} ({len(self)} locations): "
+        for ts, x, y in zip(self.timestamps[:5].tolist(), self.x[:5].tolist(), self.y[:5].tolist()):
+            string += f'[{ts}: {x}, {y}] '
+
+        if len(self) > 5:
+            string += "..."
+
+        return string
+
+    def __repr__(self):
+        return str(self)
@@ -3,17 +3,21 @@ from collections import defaultdict
 from math import sqrt
 
 import numpy as np
-
+from haversine import haversine_vector
 from networkx import NetworkXNoPath
 
 from mob_data_anonymizer.distances.trajectory.DomingoTrujillo2012.DistanceGraph import DistanceGraph
-from mob_data_anonymizer.distances.trajectory.IdeaFeliz2021.TrajectoryUtils import get_p_contemporary, get_overlap_time
+from mob_data_anonymizer.distances.trajectory.DomingoTrujillo2012.SynchronizedTrajectory import SynchronizedTrajectory
+from mob_data_anonymizer.distances.trajectory.IdeaFeliz2021.TrajectoryUtils import get_p_contemporary
+from mob_data_anonymizer.distances.trajectory.TemporalIndex import TemporalIndex
 from mob_data_anonymizer.entities.Dataset import Dataset
 from mob_data_anonymizer.entities.TimestampedLocation import TimestampedLocation
 from mob_data_anonymizer.entities.Trajectory import Trajectory
 from mob_data_anonymizer.distances.trajectory.DistanceInterface import DistanceInterface
 from mob_data_anonymizer.utils.Interpolation import interpolate
 
+NOT_CONTEMPORARY_DISTANCE = 9999999999999
+
 
 class Distance(DistanceInterface):
 
@@ -24,7 +28,9 @@ class Distance(DistanceInterface):
         '''
         self.dataset = dataset
         self.distance_matrix = defaultdict(dict)
-
+        self.trajectory_arrays = {}     # Locations of every trajectory as arrays, by id
+        self.temporal_index = None      # Lifespans of the dataset trajectories (see __get_temporal_index)
+        self.index_positions = {}       # Position of every dataset trajectory in temporal_index, by id
 
     def compute(self, trajectory1: Trajectory, trajectory2: Trajectory) -> float:
 
@@ -38,21 +44,7 @@ class Distance(DistanceInterface):
                 # avg_speed_1 = trajectory1.get_avg_speed(sp_type=self.spatial_distance)
                 # avg_speed_2 = trajectory2.get_avg_speed(sp_type=self.spatial_distance)
                 # avg_speed = (avg_speed_1 + avg_speed_2) / 2
-                d = 0.0
-                s_traj_1, s_traj_2 = self.synchronize(trajectory1, trajectory2)
-
-                ot = get_overlap_time(s_traj_1, s_traj_2)
-                ts_interval = s_traj_1.get_interval_timestamps(ot)
-
-                for ts in ts_interval:
-                    loc1 = s_traj_1.get_location_by_timestamp(ts)
-                    loc2 = s_traj_2.get_location_by_timestamp(ts)
-
-                    d += loc1.spatial_distance(loc2)
-
-                d /= pow(max(ot) - min(ot), 2)
-                d = sqrt(d)
-                d /= p
+                d = self.__compute_contemporary(trajectory1, trajectory2, p)
 
                 # sub_1 = s_traj_1.filter_by_interval(ot)
                 # sub_2 = s_traj_2.filter_by_interval(ot)
@@ -91,7 +83,7 @@ class Distance(DistanceInterface):
                 # d = sqrt(d)
 
             else:
-                d = 9999999999999
+                d = NOT_CONTEMPORARY_DISTANCE
 
         # Store the distance for later use
         self.distance_matrix[trajectory1.id][trajectory2.id] = d
@@ -99,6 +91,83 @@ class Distance(DistanceInterface):
 
         return d
 
+    def compute_one_to_many(self, trajectory: Trajectory, trajectories) -> np.ndarray:
+        distances = np.empty(len(trajectories))
+        if len(trajectories) == 0:
+            return distances
+
+        # Just the dataset trajectories overlapping in time can be contemporary, the distance to the rest is known
+        # without synchronizing them
+        index = self.__get_temporal_index()
+        positions, p = index.get_p_contemporary(trajectory)
+        contemporary = dict(zip(positions.tolist(), p.tolist()))
+        start, end = trajectory.get_first_timestamp(), trajectory.get_last_timestamp()
+
+        computed = self.distance_matrix[trajectory.id]
+        for i, t in enumerate(trajectories):
+            # Position in the index, checking the object in case of reused ids (e.g. aggregated trajectories)
+            pos = self.index_positions.get(t.id)
+            is_indexed = pos is not None and index.trajectories[pos] is t
+
+            # get_p_contemporary fails with trajectories without duration (single timestamp), as compute does
+            if t.id in computed or start == end or not is_indexed or index.ends[pos] == index.starts[pos]:
+                d = self.compute(trajectory, t)
+            else:
+                if contemporary.get(pos, 0) > 0:
+                    d = self.__compute_contemporary(trajectory, t, contemporary[pos])
+                else:
+                    d = NOT_CONTEMPORARY_DISTANCE
+                self.distance_matrix[trajectory.id][t.id] = d
+                self.distance_matrix[t.id][trajectory.id] = d
+            distances[i] = d
+
+        return distances
+
+    def __get_temporal_index(self) -> TemporalIndex:
+        '''
+        Index of the dataset trajectories, built once. Trajectories not in it are compared one by one (see compute).
+        '''
+        if self.temporal_index is None:
+            self.temporal_index = TemporalIndex(self.dataset.trajectories if self.dataset is not None else None)
+            self.index_positions = {t.id: pos for pos, t in enumerate(self.temporal_index.trajectories)}
+
+        return self.temporal_index
+
+    def __compute_contemporary(self, trajectory1: Trajectory, trajectory2: Trajectory, p: float) -> float:
+        arrays_1 = self.__get_arrays(trajectory1)
+        arrays_2 = self.__get_arrays(trajectory2)
+
+        # Both trajectories are synchronized to the union of their timestamps within the overlap time
+        ot = (max(arrays_1.get_first_timestamp(), arrays_2.get_first_timestamp()),
+              min(arrays_1.get_last_timestamp(), arrays_2.get_last_timestamp()))
+        timestamps = np.union1d(arrays_1.timestamps[arrays_1.get_interval(ot)],
+                                arrays_2.timestamps[arrays_2.get_interval(ot)])
+        s_traj_1 = arrays_1.resample(timestamps)
+        s_traj_2 = arrays_2.resample(timestamps)
+
+        d = haversine_vector(np.column_stack((s_traj_1.y, s_traj_1.x)),
+                             np.column_stack((s_traj_2.y, s_traj_2.x))).sum()
+
+        d /= pow(max(ot) - min(ot), 2)
+        d = sqrt(d)
+        d /= p
+
+        return d
+
+    def __get_arrays(self, trajectory: Trajectory) -> SynchronizedTrajectory:
+        # Trajectories are cached by id, checking the object in case of reused ids (e.g. aggregated trajectories)
+        try:
+            cached, arrays = self.trajectory_arrays[trajectory.id]
+            if cached is trajectory and len(arrays) == len(trajectory):
+                return arrays
+        except KeyError:
+            pass
+
+        arrays = SynchronizedTrajectory.from_trajectory(trajectory)
+        self.trajectory_arrays[trajectory.id] = (trajectory, arrays)
+
+        return arrays
+
     def synchronize(self, trajectory1, trajectory2):
 
         timestamps1 = trajectory1.get_timestamps()
@@ -2,22 +2,20 @@ from mob_data_anonymizer.entities.Trajectory import Trajectory
 
 
 def get_p_contemporary(traj_1: Trajectory, traj_2: Trajectory):
-    timestamps_1 = traj_1.get_timestamps()
-    timestamps_2 = traj_2.get_timestamps()
+    # Locations are sorted by timestamp
+    first_1, last_1 = traj_1.get_first_timestamp(), traj_1.get_last_timestamp()
+    first_2, last_2 = traj_2.get_first_timestamp(), traj_2.get_last_timestamp()
 
-    I = max(min(timestamps_1[-1], timestamps_2[-1]) - max(timestamps_1[0], timestamps_2[0]), 0)
+    I = max(min(last_1, last_2) - max(first_1, first_2), 0)
 
-    p = 100 * min((I / (timestamps_1[-1] - timestamps_1[0])), (I / (timestamps_2[-1] - timestamps_2[0])))
+    p = 100 * min((I / (last_1 - first_1)), (I / (last_2 - first_2)))
 
     return round(p, 2)
 
 
 def get_overlap_time(traj_1: Trajectory, traj_2: Trajectory):
-    timestamps_1 = traj_1.get_timestamps()
-    timestamps_2 = traj_2.get_timestamps()
-
-    ts_1 = max(min(timestamps_1), min(timestamps_2))
-    ts_2 = min(max(timestamps_1), max(timestamps_2))
+    ts_1 = max(traj_1.get_first_timestamp(), traj_2.get_first_timestamp())
+    ts_2 = min(traj_1.get_last_timestamp(), traj_2.get_last_timestamp())
 
     if ts_1 <= ts_2:
         return ts_1, ts_2
@@ -2,6 +2,9 @@ import itertools
 import logging
 from collections import defaultdict
 from math import sqrt
+
+import numpy as np
+from haversine import haversine_vector
 from tqdm import tqdm
 import random
 import sys
@@ -41,6 +44,8 @@ class Distance(DistanceInterface):
                 logging.info(f"\tTaking max distance = {self.max_dist}")
         self.distance_matrix = defaultdict(dict)
         self.temporal_matrix = defaultdict(dict)
+        self.trajectory_arrays = {}     # Locations as arrays and average speed of every trajectory, by id
+        self.indexes = {}               # Location indexes compared for every pair of lengths
 
     def __set_weight_parameter(self):
         if len(self.dataset.trajectories) > 1000:
@@ -334,6 +339,100 @@ class Distance(DistanceInterface):
 
         return d
 
+    def compute_one_to_many(self, trajectory: Trajectory, trajectories) -> np.ndarray:
+        '''
+        Vectorized version of compute_without_map from a trajectory to every trajectory of a block.
+        The trajectories of the block with the same length are compared at the same location indexes, so the
+        distances are computed at once for all of them.
+        Distances are not stored in the distance matrix.
+        :param trajectory: trajectory
+        :param trajectories: list (or array) of trajectories
+        :return: array of distances
+        '''
+        distances = np.empty(len(trajectories))
+
+        x_1, y_1, ts_1, speed_1 = self.__get_arrays(trajectory)
+        length_1 = len(ts_1)
+
+        # Group the trajectories by length
+        groups = defaultdict(list)
+        for pos, t in enumerate(trajectories):
+            groups[len(t)].append(pos)
+
+        for length_2, positions in groups.items():
+            arrays = [self.__get_arrays(trajectories[pos]) for pos in positions]
+            x_2 = np.stack([a[0] for a in arrays])
+            y_2 = np.stack([a[1] for a in arrays])
+            ts_2 = np.stack([a[2] for a in arrays])
+            speed_2 = np.array([a[3] for a in arrays])
+
+            avg_speed = (speed_1 + speed_2) / 2
+            avg_speed /= 3.6  # m/s
+
+            index_1, index_2 = self.__get_indexes(length_1, length_2)
+            h = len(index_1)
+
+            # One row per trajectory of the group, one column per compared location
+            x_2 = x_2[:, index_2]
+            y_2 = y_2[:, index_2]
+            d1 = self.__spatial_distance_vector(x_1[index_1], y_1[index_1], x_2, y_2) * 1000  # meters
+            d2 = self.landa * np.abs(ts_2[:, index_2] - ts_1[index_1]) * avg_speed[:, np.newaxis]  # meters
+
+            d = np.sqrt(np.square(d1 + d2).sum(axis=1) / h)
+
+            if self.normalized:
+                d /= self.max_dist  # normalization [0,1]
+
+            distances[positions] = d
+
+        return distances
+
+    def __get_arrays(self, trajectory: Trajectory) -> tuple:
+        # Trajectories are cached by id, checking the object in case of reused ids (e.g. aggregated trajectories)
+        try:
+            cached, arrays = self.trajectory_arrays[trajectory.id]
+            if cached is trajectory and len(arrays[2]) == len(trajectory):
+                return arrays
+        except KeyError:
+            pass
+
+        x = np.array([l.x for l in trajectory.locations])
+        y = np.array([l.y for l in trajectory.locations])
+        ts = np.array([l.timestamp for l in trajectory.locations], dtype=np.int64)
+        speed = trajectory.get_avg_speed(sp_type=self.spatial_distance)
+        arrays = (x, y, ts, speed)
+        self.trajectory_arrays[trajectory.id] = (trajectory, arrays)
+
+        return arrays
+
+    def __get_indexes(self, length_1: int, length_2: int) -> tuple:
+        try:
+            return self.indexes[(length_1, length_2)]
+        except KeyError:
+            h = round((length_1 + length_2) / 2)
+            # The cumulative sum performs the same sequence of float additions than compute, and rint rounds half to
+            # even as round
+            indexes = []
+            for length in (length_1, length_2):
+                steps = np.full(h, length / h)
+                steps[0] = 0.0
+                index = np.rint(np.cumsum(steps)).astype(np.int64)
+                indexes.append(np.minimum(index, length - 1))
+            self.indexes[(length_1, length_2)] = tuple(indexes)
+
+            return self.indexes[(length_1, length_2)]
+
+    def __spatial_distance_vector(self, x_1, y_1, x_2, y_2) -> np.ndarray:
+        # Same as TimestampedLocation.spatial_distance, km for Haversine
+        x_1, y_1 = np.broadcast_to(x_1, x_2.shape), np.broadcast_to(y_1, y_2.shape)
+        if self.spatial_distance == 'Haversine':
+            d = haversine_vector(np.column_stack((y_1.ravel(), x_1.ravel())),
+                                 np.column_stack((y_2.ravel(), x_2.ravel())))
+            return d.reshape(x_2.shape)
+
+        if self.spatial_distance == 'Euclidean':
+            return np.sqrt(np.square(x_2 - x_1) + np.square(y_2 - y_1))
+
     def __compute_spatial_distance(self, trajectory1: Trajectory, trajectory2: Trajectory) -> float:
         try:
             d = self.distance_matrix[trajectory1.id][trajectory2.id]
@@ -0,0 +1,90 @@
+import numpy as np
+
+
+class TemporalIndex:
+    '''
+    Index of the lifespans of a set of trajectories, to find the ones overlapping in time with a trajectory (and how
+    p-contemporary they are) without comparing it with all of them.
+    Trajectories keep their position in insertion order, and they are also sorted by first timestamp: the ones
+    overlapping with [start, end] start before end and after start minus the longest lifespan.
+    '''
+
+    def __init__(self, trajectories: list = None):
+        '''
+        :param trajectories: trajectories (or synchronized trajectories) to index
+        '''
+        self.trajectories = []
+        self.starts = np.empty(0, dtype=np.int64)          # First timestamp of every trajectory, by position
+        self.ends = np.empty(0, dtype=np.int64)            # Last timestamp of every trajectory, by position
+        self.order = np.empty(0, dtype=np.intp)            # Positions sorted by first timestamp
+        self.sorted_starts = np.empty(0, dtype=np.int64)
+        self.max_duration = 0
+
+        if trajectories is not None and len(trajectories) > 0:
+            self.add_all(trajectories)
+
+    def add_all(self, trajectories: list):
+        self.trajectories.extend(trajectories)
+        self.starts = np.append(self.starts, [t.get_first_timestamp() for t in trajectories]).astype(np.int64)
+        self.ends = np.append(self.ends, [t.get_last_timestamp() for t in trajectories]).astype(np.int64)
+
+        self.order = np.argsort(self.starts, kind='stable')
+        self.sorted_starts = self.starts[self.order]
+        self.max_duration = int((self.ends - self.starts).max(initial=0))
+
+    def add(self, trajectory):
+        position = len(self.trajectories)
+        start, end = trajectory.get_first_timestamp(), trajectory.get_last_timestamp()
+        self.trajectories.append(trajectory)
+        self.starts = np.append(self.starts, start)
+        self.ends = np.append(self.ends, end)
+
+        # After the trajectories starting at the same time, as a stable sort
+        k = self.sorted_starts.searchsorted(start, side='right')
+        self.order = np.insert(self.order, k, position)
+        self.sorted_starts = np.insert(self.sorted_starts, k, start)
+        self.max_duration = max(self.max_duration, end - start)
+
+    def get_overlapping(self, start, end) -> np.ndarray:
+        '''
+        Trajectories overlapping in time with [start, end] (with a non-zero overlap)
+        :return: sorted array of positions
+        '''
+        first = self.sorted_starts.searchsorted(start - self.max_duration, side='right')
+        last = self.sorted_starts.searchsorted(end, side='left')
+        candidates = self.order[first:last]
+        overlap = np.minimum(self.ends[candidates], end) - np.maximum(self.starts[candidates], start)
+
+        return np.sort(candidates[overlap > 0])
+
+    def get_p_contemporary(self, trajectory) -> tuple:
+        '''
+        p-contemporary (see TrajectoryUtils.get_p_contemporary) of a trajectory and the indexed ones. The rest of
+        trajectories have p = 0.
+        :param trajectory: trajectory (or synchronized trajectory)
+        :return: positions of the trajectories overlapping in time with it (see get_overlapping) and their p values
+        '''
+        start, end = trajectory.get_first_timestamp(), trajectory.get_last_timestamp()
+        positions = self.get_overlapping(start, end)
+        starts, ends = self.starts[positions], self.ends[positions]
+
+        I = np.minimum(ends, end) - np.maximum(starts, start)
+        p = 100 * np.minimum(I / (ends - starts), I / (end - start))
+        # Python round (correctly rounded) as get_p_contemporary, np.round differs in some halfway cases
+        p = np.array([round(v, 2) for v in p.tolist()])
+
+        return positions, p
+
+    def get_sweep(self) -> tuple:
+        '''
+        Sweep over the trajectories sorted by first timestamp: for every one, the following ones overlapping with it
+        are the ones up to the first starting when it ends. This way every overlapping pair is visited once.
+        :return: positions sorted by first timestamp and, for each of them, the end (excluded) of its overlapping ones
+                 in that order
+        '''
+        last_overlapping = self.sorted_starts.searchsorted(self.ends[self.order], side='left')
+
+        return self.order, last_overlapping
+
+    def __len__(self):
+        return len(self.trajectories)
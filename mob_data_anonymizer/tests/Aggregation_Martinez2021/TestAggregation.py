@@ -15,6 +15,15 @@ class TestAggregation(unittest.TestCase):
 
         # self.assertEqual(True, False)
 
+    def test_centroid(self):
+
+        dataset = get_mock_dataset()
+
+        trajectory = Aggregation.compute(dataset.trajectories)
+
+        expected = [[10, 3.0, 5.2], [13, 4.2, 6.0], [18, 4.8, 7.0], [23, 3.0, 9.6], [27, 5.6, 9.6]]
+        self.assertEqual(expected, [l.get_list() for l in trajectory.locations])
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -1,5 +1,7 @@
 import unittest
 
+import networkx as nx
+
 from mob_data_anonymizer.distances.trajectory.DomingoTrujillo2012.Distance import Distance
 from mob_data_anonymizer.distances.trajectory.DomingoTrujillo2012.DistanceGraph import DistanceGraph
 from mob_data_anonymizer.distances.trajectory.DomingoTrujillo2012.TrajectoryUtils import get_p_contemporary, get_overlap_time
@@ -213,6 +215,103 @@ class TestDistanceGraph(unittest.TestCase):
 
         # dg.draw_graph()
 
+    def test_add_node_synchronization(self):
+        dataset = get_mock_dataset_5()
+
+        dg = DistanceGraph(dataset)
+        dg.compute()
+
+        new_t = Trajectory("C")
+        new_t.add_location(TimestampedLocation(0, 15, 15))
+        new_t.add_location(TimestampedLocation(7, 20, 20))
+        new_t.add_location(TimestampedLocation(25, 25, 25))
+        dg.add_node(new_t)
+
+        new_t_2 = Trajectory("D")
+        new_t_2.add_location(TimestampedLocation(3, 15, 15))
+        new_t_2.add_location(TimestampedLocation(11, 20, 20))
+        dg.add_node(new_t_2)
+
+        # Same result than synchronizing all the trajectories at once
+        dataset.trajectories.extend([new_t, new_t_2])
+        expected = DistanceGraph(dataset)
+        expected.compute()
+
+        self.assertEqual(len(expected.synchronyzed_trajectories), len(dg.synchronyzed_trajectories))
+        for T_1, T_2 in zip(expected.synchronyzed_trajectories, dg.synchronyzed_trajectories):
+            self.assertEqual(T_1.id, T_2.id)
+            self.assertEqual(T_1.get_timestamps(), T_2.get_timestamps())
+            self.assertEqual(T_1.x.tolist(), T_2.x.tolist())
+            self.assertEqual(T_1.y.tolist(), T_2.y.tolist())
+
+        self.assertEqual({frozenset(e) for e in expected.graph.edges}, {frozenset(e) for e in dg.graph.edges})
+
+    def test_parallel_build(self):
+        dataset = get_mock_dataset_N(9)
+
+        dg = DistanceGraph(dataset)
+        dg.compute()
+        parallel_dg = DistanceGraph(dataset, n_jobs=2)
+        parallel_dg.compute()
+
+        edges = {frozenset((u, v)): d for u, v, d in dg.graph.edges(data="weight")}
+        parallel_edges = {frozenset((u, v)): d for u, v, d in parallel_dg.graph.edges(data="weight")}
+        self.assertEqual(edges, parallel_edges)
+
+    def test_shortest_paths(self):
+        dataset = get_mock_dataset_N(9)
+
+        dg = DistanceGraph(dataset)
+        dg.compute()
+
+        expected = {}
+        for t_1 in dataset.trajectories:
+            for t_2 in dataset.trajectories:
+                if dg.graph.has_edge(t_1.id, t_2.id):
+                    expected[t_1.id, t_2.id] = dg.graph[t_1.id][t_2.id]["weight"]
+                elif nx.has_path(dg.graph, t_1.id, t_2.id):
+                    expected[t_1.id, t_2.id] = nx.shortest_path_length(dg.graph, t_1.id, t_2.id, "weight")
+
+        # Lengths from every source computed once
+        for (t_1, t_2), d in expected.items():
+            self.assertAlmostEqual(d, dg.get_graph_distance(t_1, t_2))
+
+        # All the lengths computed at once
+        dg.compute_shortest_paths()
+        for (t_1, t_2), d in expected.items():
+            self.assertAlmostEqual(d, dg.get_graph_distance(t_1, t_2), places=6)
+
+    def test_scipy_backend(self):
+        dataset = get_mock_dataset_N(9)
+
+        dg = DistanceGraph(dataset)
+        dg.compute()
+        sparse_dg = DistanceGraph(dataset, backend='scipy')
+        sparse_dg.compute()
+
+        self.assertEqual(list(dg.get_nodes()), list(sparse_dg.get_nodes()))
+        self.assertEqual(dg.graph.number_of_edges(), sparse_dg.graph.number_of_edges())
+        for t_1, t_2, w in dg.graph.edges(data="weight"):
+            self.assertEqual(w, sparse_dg.graph.get_edge_data(t_1, t_2)["weight"])
+        self.assertEqual(dg.get_large_component(), sparse_dg.get_large_component())
+
+        for t_1 in dataset.trajectories:
+            for t_2 in dataset.trajectories:
+                if nx.has_path(dg.graph, t_1.id, t_2.id):
+                    self.assertAlmostEqual(dg.get_graph_distance(t_1, t_2), sparse_dg.get_graph_distance(t_1, t_2))
+
+        # New node
+        t = Trajectory(100)
+        for l in dataset.trajectories[0].locations:
+            t.add_location(TimestampedLocation(l.timestamp + 30, l.x + 0.001, l.y))
+        dg.add_node(t)
+        sparse_dg.add_node(t)
+        for t_1, t_2, w in dg.graph.edges(data="weight"):
+            self.assertAlmostEqual(w, sparse_dg.graph.get_edge_data(t_1, t_2)["weight"])
+        for t_2 in dataset.trajectories:
+            if nx.has_path(dg.graph, t.id, t_2.id):
+                self.assertAlmostEqual(dg.get_graph_distance(t, t_2), sparse_dg.get_graph_distance(t, t_2))
+
     def test_6(self):
 
         dataset = get_mock_dataset_N(9)
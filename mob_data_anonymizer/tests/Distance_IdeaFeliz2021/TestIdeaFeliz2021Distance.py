@@ -0,0 +1,62 @@
+import unittest
+from math import sqrt
+
+import numpy as np
+
+from mob_data_anonymizer.distances.trajectory.IdeaFeliz2021.Distance import Distance, NOT_CONTEMPORARY_DISTANCE
+from mob_data_anonymizer.distances.trajectory.IdeaFeliz2021.TrajectoryUtils import get_p_contemporary, \
+    get_overlap_time
+from mob_data_anonymizer.tests.build_mocks import get_mock_dataset_N
+
+
+class TestIdeaFeliz2021Distance(unittest.TestCase):
+
+    def test_compute(self):
+        dataset = get_mock_dataset_N(12)
+        distance = Distance(dataset)
+
+        for t1 in dataset.trajectories:
+            for t2 in dataset.trajectories:
+                p = get_p_contemporary(t1, t2)
+                if p > 0:
+                    # Location by location over the synchronized trajectories
+                    s_traj_1, s_traj_2 = distance.synchronize(t1, t2)
+                    ot = get_overlap_time(s_traj_1, s_traj_2)
+                    expected = sum(s_traj_1.get_location_by_timestamp(ts).spatial_distance(
+                        s_traj_2.get_location_by_timestamp(ts)) for ts in s_traj_1.get_interval_timestamps(ot))
+                    expected = sqrt(expected / pow(max(ot) - min(ot), 2)) / p
+                else:
+                    expected = NOT_CONTEMPORARY_DISTANCE
+
+                self.assertAlmostEqual(expected, distance.compute(t1, t2), delta=expected * 1e-12)
+
+    def test_compute_one_to_many(self):
+        dataset = get_mock_dataset_N(12)
+        distance = Distance(dataset)
+
+        for t1 in dataset.trajectories:
+            distances = distance.compute_one_to_many(t1, dataset.trajectories)
+            # Distances computed one by one with a new distance
+            for t2, d in zip(dataset.trajectories, distances):
+                expected = Distance(dataset).compute(t1, t2)
+                self.assertEqual(expected, d)
+
+    def test_compute_one_to_many_ndarray(self):
+        dataset = get_mock_dataset_N(12)
+        distance = Distance(dataset)
+        # Trajectories not in the dataset are compared too
+        others = get_mock_dataset_N(12).trajectories[:4]
+        for i, t in enumerate(others):
+            t.id = 100 + i
+        trajectories = np.array(dataset.trajectories + others)
+
+        for t1 in dataset.trajectories + others:
+            distances = distance.compute_one_to_many(t1, trajectories)
+            for t2, d in zip(trajectories, distances):
+                self.assertEqual(Distance(dataset).compute(t1, t2), d)
+
+        self.assertEqual(0, len(distance.compute_one_to_many(dataset.trajectories[0], np.array([]))))
+
+
+if __name__ == '__main__':
+    unittest.main()
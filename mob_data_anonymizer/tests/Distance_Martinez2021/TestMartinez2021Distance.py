@@ -0,0 +1,37 @@
+import unittest
+
+from mob_data_anonymizer.distances.trajectory.Martinez2021.Distance import Distance
+from mob_data_anonymizer.tests.build_mocks import get_mock_dataset_N
+
+
+class TestMartinez2021Distance(unittest.TestCase):
+
+    def test_compute_one_to_many(self):
+        dataset = get_mock_dataset_N(12)
+
+        for sp_type in ('Haversine', 'Euclidean'):
+            distance = Distance(dataset, sp_type=sp_type, landa=1)
+
+            for t1 in dataset.trajectories:
+                distances = distance.compute_one_to_many(t1, dataset.trajectories)
+                for t2, d in zip(dataset.trajectories, distances):
+                    expected = distance.compute_without_map(t1, t2)
+                    self.assertAlmostEqual(expected, d, delta=expected * 1e-12)
+
+    def test_compute_pairwise(self):
+        dataset = get_mock_dataset_N(12)
+        distance = Distance(dataset, sp_type='Euclidean', landa=1)
+
+        block_a = dataset.trajectories[:3]
+        block_b = dataset.trajectories[3:]
+        distances = distance.compute_pairwise(block_a, block_b)
+
+        self.assertEqual((3, 9), distances.shape)
+        for i, t1 in enumerate(block_a):
+            for j, t2 in enumerate(block_b):
+                expected = distance.compute(t1, t2)
+                self.assertAlmostEqual(expected, distances[i][j], delta=expected * 1e-12)
+
+
+if __name__ == '__main__':
+    unittest.main()
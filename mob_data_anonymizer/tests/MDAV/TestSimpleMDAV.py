@@ -1,8 +1,11 @@
 import unittest
 
+from mob_data_anonymizer.clustering.ClusteringListener import ClusteringListener
 from mob_data_anonymizer.clustering.MDAV.SimpleMDAV import SimpleMDAV
 from mob_data_anonymizer.clustering.MDAV.SimpleMDAVDataset import SimpleMDAVDataset
 from mob_data_anonymizer.distances.trajectory.DomingoTrujillo2012.Distance import Distance
+from mob_data_anonymizer.distances.trajectory.IdeaFeliz2021.Distance import Distance as IdeaFeliz2021Distance
+from mob_data_anonymizer.distances.trajectory.Martinez2021.Distance import Distance as Martinez2021Distance
 from mob_data_anonymizer.tests.build_mocks import get_mock_dataset_N
 
 
@@ -33,6 +36,57 @@ class TestSimpleMDAV(unittest.TestCase):
 
         distance.distance_graph.draw_graph()
 
+    def test_SimpleMDAV_IdeaFeliz2021(self):
+        dataset = get_mock_dataset_N(12)
+        for i, t in enumerate(dataset.trajectories):
+            t.index = i
+        mdav_dataset = SimpleMDAVDataset(dataset, IdeaFeliz2021Distance(dataset))
+
+        SimpleMDAV(mdav_dataset).run(3)
+
+        self.assertEqual(4, mdav_dataset.get_num_clusters())
+        self.assertEqual(set(range(12)), set(mdav_dataset.assigned_to))
+
+    def test_listeners(self):
+
+        class RecordListener(ClusteringListener):
+            def __init__(self):
+                self.events = []
+
+            def on_start(self, expected_clusters):
+                self.events.append(("start", expected_clusters))
+
+            def on_distances_computed(self, n_distances):
+                self.events.append(("distances", n_distances))
+
+            def on_cluster_created(self, cluster_id, size):
+                self.events.append(("cluster", cluster_id, size))
+
+            def on_finish(self, n_clusters):
+                self.events.append(("finish", n_clusters))
+
+        dataset = get_mock_dataset_N(9)
+        for i, t in enumerate(dataset.trajectories):
+            t.index = i
+        distance = Martinez2021Distance(dataset, sp_type='Euclidean', landa=1)
+        listener = RecordListener()
+
+        mdav = SimpleMDAV(SimpleMDAVDataset(dataset, distance), listeners=[listener])
+        mdav.run(3)
+
+        self.assertEqual(("start", 3), listener.events[0])
+        self.assertEqual(("finish", 3), listener.events[-1])
+        clusters = [e for e in listener.events if e[0] == "cluster"]
+        self.assertEqual([("cluster", 0, 3), ("cluster", 1, 3), ("cluster", 2, 3)], clusters)
+        self.assertIn(("distances", 9), listener.events)
+
+        # Removed listeners are not notified anymore
+        mdav.remove_listener(listener)
+        mdav.set_dataset(dataset)
+        listener.events = []
+        mdav.run(3)
+        self.assertEqual([], listener.events)
+
 
 
 
@@ -0,0 +1,69 @@
+import unittest
+
+from mob_data_anonymizer.anonymization_methods.Microaggregation.IncrementalMicroaggregation import \
+    IncrementalMicroaggregation
+from mob_data_anonymizer.distances.trajectory.Martinez2021.Distance import Distance
+from mob_data_anonymizer.entities.TimestampedLocation import TimestampedLocation
+from mob_data_anonymizer.entities.Trajectory import Trajectory
+from mob_data_anonymizer.tests.build_mocks import get_mock_dataset_N, trajectories
+
+
+def build_trajectory(id, locations):
+    trajectory = Trajectory(id)
+    for l in locations:
+        trajectory.add_location(TimestampedLocation(l[0], l[1], l[2]))
+
+    return trajectory
+
+
+class TestIncrementalMicroaggregation(unittest.TestCase):
+
+    def setUp(self):
+        self.dataset = get_mock_dataset_N(9)
+        distance = Distance(self.dataset, sp_type='Euclidean', landa=1)
+        self.microaggregation = IncrementalMicroaggregation(self.dataset, k=3, distance=distance)
+        self.microaggregation.run()
+
+    def test_append_new_clusters(self):
+        centroids = dict(self.microaggregation.get_centroids())
+
+        # Trajectories far in time from the previous ones form a new cluster
+        new_trajectories = [build_trajectory(idx, [[l[0] + 100000, l[1], l[2]] for l in t])
+                            for idx, t in enumerate(trajectories[9:12], start=9)]
+        touched = self.microaggregation.append(new_trajectories)
+
+        self.assertEqual({3}, touched)
+        self.assertEqual([9, 10, 11], sorted(t.id for t in self.microaggregation.get_clusters()[3]))
+
+        # Every cluster keeps at least k trajectories
+        clusters = self.microaggregation.get_clusters()
+        for c in clusters:
+            self.assertGreaterEqual(len(clusters[c]), 3)
+
+        # Untouched clusters keep their centroids
+        for c in centroids:
+            if c not in touched:
+                self.assertIs(centroids[c], self.microaggregation.get_centroids()[c])
+
+        anonymized_dataset = self.microaggregation.get_anonymized_dataset()
+        self.assertEqual(list(range(12)), [t.id for t in anonymized_dataset.trajectories])
+        self.assertEqual(12, len(self.dataset))
+
+    def test_append_few_trajectories(self):
+        n_clusters = len(self.microaggregation.get_clusters())
+
+        # Less than k new trajectories join existing clusters
+        touched = self.microaggregation.append([build_trajectory(9, trajectories[9])])
+
+        self.assertEqual(n_clusters, len(self.microaggregation.get_clusters()))
+        self.assertEqual(1, len(touched))
+        c = touched.pop()
+        self.assertIn(9, [t.id for t in self.microaggregation.get_clusters()[c]])
+
+        anonymized_dataset = self.microaggregation.get_anonymized_dataset()
+        anonymized_t = anonymized_dataset.get_trajectory(9)
+        self.assertIs(self.microaggregation.get_centroids()[c].locations, anonymized_t.locations)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,64 @@
+import random
+import unittest
+
+import numpy as np
+from haversine import Unit, haversine
+
+from mob_data_anonymizer.anonymization_methods.SwapLocations.SwapLocations import LocationIndex
+from mob_data_anonymizer.tests.build_mocks import get_mock_tdf
+
+
+class TestLocationIndex(unittest.TestCase):
+
+    def test_get_candidates(self):
+        tdf = get_mock_tdf(12)
+        index = LocationIndex(tdf, max_r_s=600000, max_r_t=10)
+        rng = random.Random(0)
+        remaining = list(range(len(tdf)))
+
+        while remaining:
+            position = rng.choice(remaining)
+            candidates = index.get_candidates(position).tolist()
+            self.assertEqual(sorted(candidates), candidates)
+            self.assertTrue(set(candidates) <= set(remaining))
+
+            # Every remaining location within max_r_s and max_r_t is a candidate
+            for p in remaining:
+                distance = haversine((tdf['lat'].iloc[p], tdf['lng'].iloc[p]),
+                                     (tdf['lat'].iloc[position], tdf['lng'].iloc[position]), unit=Unit.METERS)
+                dif_time = abs((tdf['datetime'].iloc[p] - tdf['datetime'].iloc[position]).total_seconds())
+                if distance <= 600000 and dif_time <= 10:
+                    self.assertIn(p, candidates)
+
+            np.testing.assert_array_equal(index.get_time_differences(position, np.array(candidates)),
+                                          np.abs((tdf['datetime'].iloc[candidates] -
+                                                  tdf['datetime'].iloc[position]).dt.total_seconds()).to_numpy())
+
+            removed = [position] + [p for p in candidates if p != position and rng.random() < 0.5]
+            index.remove(removed)
+            remaining = [p for p in remaining if p not in removed]
+            self.assertEqual(len(remaining), len(index))
+
+    def test_choice(self):
+        tdf = get_mock_tdf(12)
+        index = LocationIndex(tdf, max_r_s=1000, max_r_t=10, random_state=np.random.RandomState(0))
+        remaining = list(range(len(tdf)))
+        global_state = np.random.get_state()
+
+        # k-th remaining location, k drawn with the random generator of the index
+        random_state = np.random.RandomState(0)
+        rng = random.Random(1)
+        while remaining:
+            position = index.choice()
+            self.assertEqual(remaining[random_state.randint(len(remaining))], position)
+
+            removed = [position] + [p for p in remaining if p != position and rng.random() < 0.2]
+            index.remove(removed)
+            remaining = [p for p in remaining if p not in removed]
+
+        # numpy's global random generator is not used
+        np.testing.assert_array_equal(global_state[1], np.random.get_state()[1])
+
+
+if __name__ == '__main__':
+    unittest.main()
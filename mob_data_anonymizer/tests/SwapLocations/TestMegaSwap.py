@@ -0,0 +1,51 @@
+import random
+import unittest
+from collections import Counter
+
+from mob_data_anonymizer.anonymization_methods.SwapLocations.MegaSwap import MegaSwap, LocationPool
+from mob_data_anonymizer.tests.build_mocks import get_mock_dataset_N
+
+
+class TestMegaSwap(unittest.TestCase):
+
+    def test_run(self):
+        dataset = get_mock_dataset_N(12)
+        original = Counter((l.timestamp, l.x, l.y) for t in dataset.trajectories for l in t.locations)
+
+        mega_swap = MegaSwap(dataset, R_s=1000, R_t=10, seed=0)
+        mega_swap.run()
+        anon_dataset = mega_swap.get_anonymized_dataset()
+
+        # Just original locations, swapped among trajectories
+        anonymized = Counter((l.timestamp, l.x, l.y) for t in anon_dataset.trajectories for l in t.locations)
+        self.assertTrue(anonymized)
+        self.assertFalse(anonymized - original)
+
+        # Same result with the same seed
+        mega_swap = MegaSwap(dataset, R_s=1000, R_t=10, seed=0)
+        mega_swap.run()
+        self.assertEqual([(t.id, t.locations) for t in anon_dataset.trajectories],
+                         [(t.id, t.locations) for t in mega_swap.get_anonymized_dataset().trajectories])
+
+    def test_location_pool(self):
+        dataset = get_mock_dataset_N(12)
+        pool = LocationPool(dataset.trajectories, 1000, 10)
+        remaining = list(range(len(pool.locations)))
+
+        # Same choices than random.choice over the list of remaining locations
+        random.seed(0)
+        rng = random.Random(1)
+        while remaining:
+            state = random.getstate()
+            position = pool.choice()
+            random.setstate(state)
+            self.assertEqual(random.choice(remaining), position)
+
+            removed = [position] + [p for p in remaining if p != position and rng.random() < 0.2]
+            pool.remove(removed)
+            remaining = [p for p in remaining if p not in removed]
+            self.assertEqual(len(remaining), len(pool))
+
+
+if __name__ == '__main__':
+    unittest.main()
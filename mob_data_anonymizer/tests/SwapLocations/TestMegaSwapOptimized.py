@@ -0,0 +1,37 @@
+import unittest
+from collections import Counter
+
+import numpy as np
+
+from mob_data_anonymizer.anonymization_methods.SwapLocations.MegaSwapOptimized import MegaSwapOptimized
+from mob_data_anonymizer.tests.build_mocks import get_mock_dataset_N
+
+
+class TestMegaSwapOptimized(unittest.TestCase):
+
+    def test_run(self):
+        dataset = get_mock_dataset_N(12)
+        original = Counter((l.timestamp, l.x, l.y) for t in dataset.trajectories for l in t.locations)
+
+        np.random.seed(0)
+        mega_swap = MegaSwapOptimized(dataset, R_s=1000, R_t=10)
+        mega_swap.run()
+        anon_dataset = mega_swap.get_anonymized_dataset()
+
+        # Just original locations, swapped among trajectories
+        anonymized = Counter((l.timestamp, l.x, l.y) for t in anon_dataset.trajectories for l in t.locations)
+        self.assertTrue(anonymized)
+        self.assertFalse(anonymized - original)
+        for t in anon_dataset.trajectories:
+            self.assertEqual(sorted(l.timestamp for l in t.locations), [l.timestamp for l in t.locations])
+
+        # Same result with the same seed
+        np.random.seed(0)
+        mega_swap = MegaSwapOptimized(dataset, R_s=1000, R_t=10)
+        mega_swap.run()
+        self.assertEqual([(t.id, t.locations) for t in anon_dataset.trajectories],
+                         [(t.id, t.locations) for t in mega_swap.get_anonymized_dataset().trajectories])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,77 @@
+import unittest
+
+import numpy as np
+
+from mob_data_anonymizer.anonymization_methods.SwapLocations.SwapLocations import SwapLocations, LocationIndex
+from mob_data_anonymizer.entities.Dataset import Dataset
+from mob_data_anonymizer.entities.TimestampedLocation import TimestampedLocation
+from mob_data_anonymizer.entities.Trajectory import Trajectory
+from mob_data_anonymizer.tests.build_mocks import get_mock_dataset_N
+
+
+class CountingBar:
+    def __init__(self):
+        self.n = 0
+
+    def update(self, n):
+        self.n += n
+
+
+class TestSwapLocationsPartitions(unittest.TestCase):
+
+    def test_get_clusters_by_partition(self):
+        dataset = get_mock_dataset_N(12)
+        for t in dataset.trajectories:
+            t.user_id = t.id
+        tdf = dataset.to_tdf()
+        ids = tdf[['tid', 'uid']].to_numpy()
+
+        results = []
+        for n_jobs in (2, 3):
+            swap_locations = SwapLocations(dataset, k=2, max_r_s=300000, min_r_s=100000, max_r_t=4, min_r_t=2,
+                                           seed=1, n_jobs=n_jobs)
+            index = LocationIndex(tdf, swap_locations.max_r_s, swap_locations.max_r_t)
+            pbar = CountingBar()
+            clusters = swap_locations.get_clusters_by_partition(tdf, index, pbar)
+            self.assertTrue(clusters)
+            self.assertEqual(0, len(index))
+            self.assertEqual(len(tdf), pbar.n)
+
+            # Every location in one cluster at most, with locations of different trajectories within the radii
+            positions = np.concatenate([swapped for (swapped, _, _, _) in clusters])
+            self.assertEqual(len(positions), len(set(positions.tolist())))
+            for (swapped, dif_time, distance, swapped_ids) in clusters:
+                self.assertGreaterEqual(len(swapped), 2)
+                self.assertEqual(len(swapped), len(set(ids[swapped, 0].tolist())))
+                self.assertTrue((dif_time <= 4).all() and (distance <= 300000).all())
+                self.assertEqual(sorted(ids[swapped].tolist()), sorted(swapped_ids.tolist()))
+
+            results.append([[values.tolist() for values in cluster] for cluster in clusters])
+
+        # Same clusters whatever the number of processes
+        self.assertEqual(results[0], results[1])
+
+    def test_swapped_partition(self):
+        # The location of tid 0 is at the end of a time partition (968 seconds with the default max_r_t) and the ones
+        # of tids 1 and 2 at the beginning of the next one, so the first round swaps all of them
+        start = 968 * 1000
+        dataset = Dataset()
+        for tid, timestamp in ((0, start + 960), (1, start + 970), (2, start + 975)):
+            trajectory = Trajectory(tid)
+            trajectory.user_id = tid
+            trajectory.add_location(TimestampedLocation(timestamp, 2.0, 41.0))
+            dataset.add_trajectory(trajectory)
+        tdf = dataset.to_tdf()
+
+        swap_locations = SwapLocations(dataset, seed=1, n_jobs=2)
+        index = LocationIndex(tdf, swap_locations.max_r_s, swap_locations.max_r_t)
+        pbar = CountingBar()
+        clusters = swap_locations.get_clusters_by_partition(tdf, index, pbar)
+
+        self.assertEqual([[0, 1, 2]], [sorted(swapped.tolist()) for (swapped, _, _, _) in clusters])
+        self.assertEqual(0, len(index))
+        self.assertEqual(3, pbar.n)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,122 @@
+import unittest
+
+import numpy as np
+
+from mob_data_anonymizer.anonymization_methods.SwapMob import SwapMob as swap_mob_module
+from mob_data_anonymizer.anonymization_methods.SwapMob.SwapMob import SwapMob, TrajectoryRelabeling
+from mob_data_anonymizer.entities.TimestampedLocation import TimestampedLocation
+from mob_data_anonymizer.tests.build_mocks import get_mock_dataset_N
+
+
+class TestSwapMob(unittest.TestCase):
+
+    def test_get_possible_swaps(self):
+        dataset = get_mock_dataset_N(12)
+        locs_in_interval = dataset.to_numpy(sort_by_timestamp=True)
+
+        for spatial_thold in (100, 500, 1000):
+            swap_mob = SwapMob(dataset, spatial_thold, 30)
+
+            # Every pair of locations of different trajectories
+            expected = []
+            locations = [TimestampedLocation(loc[2], loc[0], loc[1]) for loc in locs_in_interval]
+            for idx1, l1 in enumerate(locations):
+                close_locations = [idx2 for idx2, l2 in enumerate(locations)
+                                   if locs_in_interval[idx1, 3] != locs_in_interval[idx2, 3] and
+                                   l1.spatial_distance(l2) < spatial_thold]
+                if close_locations:
+                    expected.append((idx1, close_locations))
+
+            self.assertTrue(expected)
+            self.assertEqual(expected, swap_mob.get_possible_swaps(locs_in_interval))
+
+        # Distance just below and equal to the threshold
+        locs_in_interval = np.array([[0, 0, 0, 1, 1], [0, 1, 0, 2, 2]])
+        distance = TimestampedLocation(0, 0, 0).spatial_distance(TimestampedLocation(0, 0, 1))
+        self.assertEqual([], SwapMob(dataset, distance, 30).get_possible_swaps(locs_in_interval))
+        self.assertEqual([(0, [1]), (1, [0])],
+                         SwapMob(dataset, np.nextafter(distance, np.inf), 30).get_possible_swaps(locs_in_interval))
+
+    def test_select_random_swaps(self):
+        dataset = get_mock_dataset_N(12)
+        locs_in_interval = dataset.to_numpy(sort_by_timestamp=True)
+        swap_mob = SwapMob(dataset, 1000, 30, seed=1)
+        possible_swaps = swap_mob.get_possible_swaps(locs_in_interval)
+        close = {(idx1, idx2) for idx1, close_locations in possible_swaps for idx2 in close_locations}
+
+        swaps = swap_mob.select_random_swaps(possible_swaps, locs_in_interval)
+        self.assertTrue(swaps)
+
+        # Possible swaps sorted by timestamp, every trajectory swapped once at most
+        swapped = []
+        for (idx1, idx2) in swaps:
+            self.assertIn((idx1, idx2), close)
+            self.assertLessEqual(locs_in_interval[idx1, 2], locs_in_interval[idx2, 2])
+            swapped += [locs_in_interval[idx1, 3], locs_in_interval[idx2, 3]]
+        self.assertEqual(len(swapped), len(set(swapped)))
+
+        # No possible swap left between trajectories not swapped
+        for (idx1, idx2) in close:
+            self.assertTrue(locs_in_interval[idx1, 3] in swapped or locs_in_interval[idx2, 3] in swapped)
+
+    def test_do_swaps(self):
+        dataset = get_mock_dataset_N(12)
+        np_dataset = dataset.to_numpy(sort_by_timestamp=True)
+        expected = np_dataset.copy()
+        relabeling = TrajectoryRelabeling(np_dataset)
+        swap_mob = SwapMob(dataset, 1000, 30)
+
+        intervals = [(0, 4), (6, 10), (10, 15), (20, len(np_dataset))]
+        for (ini_idx, end_idx) in intervals:
+            # Swap every pair of trajectories in the interval, each trajectory at most once
+            positions = {}
+            for idx in range(ini_idx, end_idx):
+                positions.setdefault(expected[idx, 3], idx)
+            firsts = list(positions.values())
+            swaps = [(idx1 - ini_idx, idx2 - ini_idx) for idx1, idx2 in zip(firsts[0::2], firsts[1::2])]
+
+            # Swap all the previous locations, one swap at a time
+            expected_swaps_per_traj = {}
+            for (raw_idx1, raw_idx2) in swaps:
+                idx1, idx2 = ini_idx + raw_idx1, ini_idx + raw_idx2
+                t1, t2 = expected[idx1, 3], expected[idx2, 3]
+                u1, u2 = expected[idx1, 4], expected[idx2, 4]
+                previous1 = np.flatnonzero(expected[:idx1 + 1, 3] == t1)
+                previous2 = np.flatnonzero(expected[:idx2 + 1, 3] == t2)
+                expected[previous1, 3], expected[previous1, 4] = t2, u2
+                expected[previous2, 3], expected[previous2, 4] = t1, u1
+                expected_swaps_per_traj[t1] = expected_swaps_per_traj.get(t1, 0) + 1
+                expected_swaps_per_traj[t2] = expected_swaps_per_traj.get(t2, 0) + 1
+
+            relabeling.set_interval(ini_idx, end_idx)
+            self.assertEqual(expected_swaps_per_traj, swap_mob.do_swaps(relabeling, swaps, ini_idx))
+
+        relabeling.apply(np_dataset)
+        np.testing.assert_array_equal(expected, np_dataset)
+
+    def test_run_n_jobs(self):
+        dataset = get_mock_dataset_N(12)
+        intervals = [(0, 3), (3, 5), (5, 9), (9, 20)]
+        np_dataset = dataset.to_numpy(sort_by_timestamp=True)
+
+        # Tasks of a few locations, so intervals are computed by different workers
+        task_locations = swap_mob_module.TASK_LOCATIONS
+        swap_mob_module.TASK_LOCATIONS = 5
+        try:
+            expected = list(SwapMob(dataset, 1000, 30).get_all_possible_swaps(np_dataset, intervals))
+            possible_swaps = list(SwapMob(dataset, 1000, 30, n_jobs=2).get_all_possible_swaps(np_dataset, intervals))
+            self.assertEqual(expected, possible_swaps)
+
+            anonymized = []
+            for n_jobs in (1, 2):
+                swap_mob = SwapMob(dataset, 1000, 30, seed=1, n_jobs=n_jobs)
+                swap_mob.run()
+                anonymized.append(swap_mob.get_anonymized_dataset().to_numpy())
+        finally:
+            swap_mob_module.TASK_LOCATIONS = task_locations
+
+        np.testing.assert_array_equal(anonymized[0], anonymized[1])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -25,6 +25,18 @@ class TestDistance(unittest.TestCase):
         d = distance.compute(traj_1, traj_2)
         self.assertEqual(0.02784, d)
 
+    def test_compute_one_to_many(self):
+        dataset = get_mock_dataset()
+
+        distance = Distance(dataset)
+        distances = distance.compute_one_to_many(dataset.get_trajectory(1), dataset.trajectories)
+
+        # Distances computed one by one with a new distance
+        distance = Distance(dataset)
+        for t, d in zip(dataset.trajectories, distances):
+            expected = distance.compute(dataset.get_trajectory(1), t)
+            self.assertAlmostEqual(expected, d)
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,41 @@
+import unittest
+
+import numpy as np
+from haversine import haversine_vector
+
+from mob_data_anonymizer.tests.build_mocks import get_mock_dataset_N
+from mob_data_anonymizer.utils.SpatioTemporalGrid import SpatioTemporalGrid
+
+
+class TestSpatioTemporalGrid(unittest.TestCase):
+
+    def test_neighbours(self):
+        dataset = get_mock_dataset_N(12)
+        x = np.array([l.x for t in dataset.trajectories for l in t.locations])
+        y = np.array([l.y for t in dataset.trajectories for l in t.locations])
+        timestamps = np.array([l.timestamp for t in dataset.trajectories for l in t.locations])
+
+        for R_s, R_t in ((300, 5), (1000, 10), (5000, 50)):
+            grid = SpatioTemporalGrid(x, y, timestamps, R_s, R_t)
+            for i in range(len(x)):
+                distances = haversine_vector((y[i], x[i]), np.column_stack((y, x)), comb=True).ravel()
+                expected = np.flatnonzero((np.abs(timestamps - timestamps[i]) <= R_t) & (distances <= R_s))
+                self.assertEqual(expected.tolist(), grid.get_neighbours(x[i], y[i], timestamps[i], R_s, R_t).tolist())
+
+    def test_antimeridian(self):
+        # Close locations on both sides of longitude 180
+        x = np.array([179.999, -179.999, 179.5])
+        y = np.array([60.0, 60.0, 60.0])
+        timestamps = np.array([0, 0, 0])
+
+        grid = SpatioTemporalGrid(x, y, timestamps, 1, 0)
+        self.assertEqual([0, 1], grid.get_neighbours(x[0], y[0], timestamps[0], 1, 0).tolist())
+
+    def test_empty(self):
+        grid = SpatioTemporalGrid(np.empty(0), np.empty(0), np.empty(0, dtype=np.int64), 1000, 10)
+        self.assertEqual(0, len(grid.get_candidates(0, 0, 0)))
+        self.assertEqual(0, len(grid.get_neighbours(0, 0, 0, 1000, 10)))
+
+
+if __name__ == '__main__':
+    unittest.main()
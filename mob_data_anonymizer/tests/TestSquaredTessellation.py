@@ -0,0 +1,64 @@
+import unittest
+
+import numpy as np
+import pandas as pd
+from shapely.geometry import Point
+from skmob.tessellation import tilers
+
+from mob_data_anonymizer.tests.build_mocks import get_mock_tdf
+from mob_data_anonymizer.utils.SquaredTessellation import SquaredTessellation
+from mob_data_anonymizer.utils.tessellation import _get_bounding_box, spatial_tessellation
+
+
+class TestSquaredTessellation(unittest.TestCase):
+
+    def setUp(self):
+        # Small area (some thousands of tiles) with the locations of the mock dataset
+        self.tdf = get_mock_tdf(12, small_area=True)
+        self.bounding_box = _get_bounding_box(self.tdf)
+        self.tiles = tilers.tiler.get("squared", base_shape=self.bounding_box, meters=100)
+
+    def test_to_geodataframe(self):
+        tessellation = SquaredTessellation(self.bounding_box, 100)
+        gdf = tessellation.to_geodataframe()
+
+        self.assertEqual(len(self.tiles), len(tessellation))
+        self.assertListEqual(self.tiles['tile_ID'].tolist(), gdf['tile_ID'].tolist())
+        for expected, polygon in zip(self.tiles.geometry, gdf.geometry):
+            self.assertTrue(expected.equals_exact(polygon, 0))
+
+    def test_get_tile_ids(self):
+        tessellation = SquaredTessellation(self.bounding_box, 100)
+        # Locations plus some in the edges of the tiles
+        lng = np.concatenate((self.tdf['lng'], tessellation.lng_edges[:10], self.tdf['lng'][:10]))
+        lat = np.concatenate((self.tdf['lat'], self.tdf['lat'][:10], tessellation.lat_edges[:10]))
+        tile_ids = tessellation.get_tile_ids(lng, lat)
+
+        for x, y, tile_id in zip(lng, lat, tile_ids):
+            within = [int(t) for t, polygon in zip(self.tiles['tile_ID'], self.tiles.geometry)
+                      if Point(x, y).within(polygon)]
+            self.assertListEqual(within, [tile_id] if tile_id >= 0 else [])
+
+    def test_get_centroids(self):
+        centroids = SquaredTessellation(self.bounding_box, 100).get_centroids()
+
+        self.assertListEqual(self.tiles['tile_ID'].tolist(), centroids['tile_ID'].tolist())
+        np.testing.assert_array_equal(round(self.tiles.geometry.centroid.x, 5), round(centroids['x'], 5))
+        np.testing.assert_array_equal(round(self.tiles.geometry.centroid.y, 5), round(centroids['y'], 5))
+
+    def test_spatial_tessellation(self):
+        mtdf, tessellation = spatial_tessellation(self.tdf, "squared", 100)
+        tile_ids = tessellation.get_tile_ids(self.tdf['lng'], self.tdf['lat'])
+
+        # Same rows, index and columns than tdf, without the locations not within a tile
+        expected = self.tdf[tile_ids >= 0]
+        pd.testing.assert_frame_equal(expected, mtdf.drop(columns='tile_ID'))
+        self.assertListEqual([str(t) for t in tile_ids[tile_ids >= 0]], mtdf['tile_ID'].tolist())
+
+        # Tessellating with the same tiles
+        mtdf_2, _ = spatial_tessellation(self.tdf, "squared", tiles=tessellation)
+        pd.testing.assert_frame_equal(mtdf, mtdf_2)
+
+
+if __name__ == '__main__':
+    unittest.main()
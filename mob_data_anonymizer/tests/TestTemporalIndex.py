@@ -0,0 +1,58 @@
+import unittest
+
+from mob_data_anonymizer.distances.trajectory.DomingoTrujillo2012.TrajectoryUtils import get_p_contemporary
+from mob_data_anonymizer.distances.trajectory.TemporalIndex import TemporalIndex
+from mob_data_anonymizer.entities.TimestampedLocation import TimestampedLocation
+from mob_data_anonymizer.entities.Trajectory import Trajectory
+from mob_data_anonymizer.tests.build_mocks import get_mock_dataset, get_mock_dataset_N
+
+
+class TestTemporalIndex(unittest.TestCase):
+
+    def test_p_contemporary(self):
+        for dataset in (get_mock_dataset(), get_mock_dataset_N(12)):
+            index = TemporalIndex(dataset.trajectories)
+
+            for t1 in dataset.trajectories:
+                positions, p = index.get_p_contemporary(t1)
+                expected = {i: get_p_contemporary(t1, t2) for i, t2 in enumerate(dataset.trajectories)}
+                self.assertEqual({i for i, p_i in expected.items() if p_i > 0}, set(positions.tolist()))
+                for i, p_i in zip(positions.tolist(), p.tolist()):
+                    self.assertEqual(expected[i], p_i)
+
+    def test_add(self):
+        dataset = get_mock_dataset_N(12)
+        index = TemporalIndex(dataset.trajectories[:6])
+        for t in dataset.trajectories[6:]:
+            index.add(t)
+
+        # A long trajectory added at the end
+        t = Trajectory(100)
+        t.add_location(TimestampedLocation(0, 0, 0))
+        t.add_location(TimestampedLocation(10 ** 10, 0, 0))
+        index.add(t)
+
+        complete = TemporalIndex(dataset.trajectories + [t])
+        self.assertEqual(complete.order.tolist(), index.order.tolist())
+        for t1 in complete.trajectories:
+            start, end = t1.get_first_timestamp(), t1.get_last_timestamp()
+            self.assertEqual(complete.get_overlapping(start, end).tolist(), index.get_overlapping(start, end).tolist())
+            self.assertIn(12, index.get_overlapping(start, end).tolist())
+
+    def test_sweep(self):
+        dataset = get_mock_dataset_N(12)
+        index = TemporalIndex(dataset.trajectories)
+
+        # Every overlapping pair once
+        order, last_overlapping = index.get_sweep()
+        pairs = {frozenset((order[k], j)) for k in range(len(order)) for j in order[k + 1:last_overlapping[k]]}
+        expected = set()
+        for i, t in enumerate(dataset.trajectories):
+            for j in index.get_overlapping(t.get_first_timestamp(), t.get_last_timestamp()):
+                if i != j:
+                    expected.add(frozenset((i, j)))
+        self.assertEqual(expected, pairs)
+
+
+if __name__ == '__main__':
+    unittest.main()
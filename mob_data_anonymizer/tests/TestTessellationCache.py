@@ -0,0 +1,55 @@
+import os
+import tempfile
+import unittest
+
+import numpy as np
+from geopandas import GeoDataFrame
+from shapely.geometry import Polygon
+from skmob.utils.constants import DEFAULT_CRS
+
+from mob_data_anonymizer.tests.build_mocks import get_mock_tdf
+from mob_data_anonymizer.utils.tessellation import TessellationCache, _get_bounding_box
+
+
+class TestTessellationCache(unittest.TestCase):
+
+    def test_get(self):
+        tdf = get_mock_tdf(12, small_area=True)
+        cache = TessellationCache(max_size=2)
+
+        tiles = cache.get(_get_bounding_box(tdf), "squared", 100)
+        self.assertIs(tiles, cache.get(_get_bounding_box(tdf), "squared", 100))
+        self.assertIsNot(tiles, cache.get(_get_bounding_box(tdf), "squared", 200))
+        self.assertIsNot(tiles, cache.get(_get_bounding_box(tdf[tdf['lat'] > tdf['lat'].min()]), "squared", 100))
+
+        # The least recently used tessellation is discarded
+        self.assertEqual(2, len(cache.tiles))
+        self.assertIsNot(tiles, cache.get(_get_bounding_box(tdf), "squared", 100))
+
+    def test_geometry(self):
+        cache = TessellationCache()
+        rectangle = GeoDataFrame(geometry=[Polygon([(2, 40), (2, 40.01), (2.01, 40.01), (2.01, 40)])], crs=DEFAULT_CRS)
+        triangle = GeoDataFrame(geometry=[Polygon([(2, 40), (2, 40.01), (2.01, 40)])], crs=DEFAULT_CRS)
+
+        # Same bounds, but different shapes
+        tiles = cache.get(rectangle, "squared", 100)
+        self.assertIsNot(tiles, cache.get(triangle, "squared", 100))
+        self.assertIs(tiles, cache.get(rectangle, "squared", 100))
+
+    def test_folder(self):
+        tdf = get_mock_tdf(12, small_area=True)
+
+        with tempfile.TemporaryDirectory() as folder:
+            tiles = TessellationCache(folder=folder).get(_get_bounding_box(tdf), "squared", 100)
+            self.assertEqual(1, len(os.listdir(folder)))
+
+            # Loaded by another cache
+            loaded = TessellationCache(folder=folder).get(_get_bounding_box(tdf), "squared", 100)
+            self.assertIsNot(tiles, loaded)
+            np.testing.assert_array_equal(tiles.lng_edges, loaded.lng_edges)
+            np.testing.assert_array_equal(tiles.lat_edges, loaded.lat_edges)
+            self.assertEqual(tiles.n_rows, loaded.n_rows)
+
+
+if __name__ == '__main__':
+    unittest.main()
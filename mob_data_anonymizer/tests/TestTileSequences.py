@@ -0,0 +1,61 @@
+import random
+import unittest
+
+import numpy as np
+from more_itertools import pairwise
+
+from mob_data_anonymizer.utils.TileSequences import TileSequences
+
+
+class TestTileSequences(unittest.TestCase):
+
+    def setUp(self):
+        rng = random.Random(0)
+        self.tids = [rng.randrange(20) for _ in range(500)]
+        self.tiles = [str(rng.randrange(15)) for _ in range(500)]
+
+        # Tiles of every trajectory in order of first visit
+        self.expected = {}
+        for tid, tile in zip(self.tids, self.tiles):
+            if tile not in self.expected.setdefault(tid, []):
+                self.expected[tid].append(tile)
+        self.expected[100] = ['3']
+        self.tids.append(100)
+        self.tiles.append('3')
+
+    def test_get_sequences(self):
+        sequences = TileSequences(self.tids, self.tiles)
+        self.assertEqual(list(self.expected.items()), list(sequences.get_sequences().items()))
+
+    def test_count_bigrams(self):
+        sequences = TileSequences(self.tids, self.tiles)
+
+        # Trajectories with every bigram (or single tile)
+        expected = {}
+        for tid, tiles in self.expected.items():
+            for bigram in (pairwise(tiles) if len(tiles) > 1 else [(tiles[0], None)]):
+                expected.setdefault(bigram, set()).add(tid)
+
+        keys, counts, trajectories, offsets = sequences.count_bigrams()
+        first, second = sequences.unpack_bigrams(keys)
+        bigrams = {}
+        for i, (t1, t2) in enumerate(zip(first.tolist(), second.tolist())):
+            bigram = (sequences.tiles[t1], sequences.tiles[t2] if t2 >= 0 else None)
+            bigrams[bigram] = set(sequences.tids[trajectories[offsets[i]:offsets[i + 1]]].tolist())
+            self.assertEqual(len(bigrams[bigram]), counts[i])
+
+        self.assertEqual(expected, bigrams)
+        np.testing.assert_array_equal(np.sort(keys), keys)
+
+    def test_get_codes(self):
+        sequences = TileSequences(self.tids, self.tiles)
+        tid_codes, tile_codes = sequences.get_codes([100, 5, 200], ['3', '20', '0'])
+
+        self.assertEqual([100, 5], sequences.tids[tid_codes[:2]].tolist())
+        self.assertEqual(-1, tid_codes[2])
+        self.assertEqual('3', sequences.tiles[tile_codes[0]])
+        self.assertEqual([-1, sequences.tiles.tolist().index('0')], tile_codes[1:].tolist())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -172,6 +172,23 @@ def get_mock_dataset_N(num):
     return dataset
 
 
+def get_mock_tdf(num, small_area=False):
+    '''
+    TrajDataFrame of get_mock_dataset_N(num), with the trajectory ids as user ids
+    :param small_area: whether to move the locations to an area of some km around (40, 2), e.g. to be tessellated
+    '''
+    dataset = get_mock_dataset_N(num)
+    for t in dataset.trajectories:
+        t.user_id = t.id
+
+    tdf = dataset.to_tdf()
+    if small_area:
+        tdf['lat'] = 40 + tdf['lat'] / 1000
+        tdf['lng'] = 2 + tdf['lng'] / 1000
+
+    return tdf
+
+
 def get_mock_trajectory_1():
     t = [[0, 0, 0], [5, 5, 5]]
 
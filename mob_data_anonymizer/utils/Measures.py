@@ -12,11 +12,11 @@ from skmob.tessellation import tilers
 from skmob.utils import constants
 from skmob.utils.constants import DEFAULT_CRS
 
-from mob_data_anonymizer.utils.tessellation import spatial_tessellation
+from mob_data_anonymizer.utils.tessellation import spatial_tessellation, get_centroids, DEFAULT_TILE_SIZE
 
 
 class Measures:
-    def __init__(self, original_tdf: TrajDataFrame, anonymized_tdf: TrajDataFrame, sort=True, tesselation_meters=250,
+    def __init__(self, original_tdf: TrajDataFrame, anonymized_tdf: TrajDataFrame, sort=True, tesselation_meters=DEFAULT_TILE_SIZE,
                  output_folder=""):
 
         self.pre_original_tdf = original_tdf
@@ -38,9 +38,10 @@ class Measures:
         self.original_tdf, tiles = spatial_tessellation(self.pre_original_tdf, "squared",
                                                         meters=self.tile_size)
 
-        tiles['x'] = round(tiles['geometry'].centroid.x, 5)
-        tiles['y'] = round(tiles['geometry'].centroid.y, 5)
-        self.original_tdf = pandas.merge(self.original_tdf, tiles, how="left", on="tile_ID")
+        centroids = get_centroids(tiles)
+        centroids['x'] = round(centroids['x'], 5)
+        centroids['y'] = round(centroids['y'], 5)
+        self.original_tdf = pandas.merge(self.original_tdf, centroids, how="left", on="tile_ID")
         self.original_tdf.rename(columns={
             constants.LATITUDE: 'orig_lat',
             constants.LONGITUDE: 'orig_lng',
@@ -52,7 +53,7 @@ class Measures:
         self.anonymized_tdf, _ = spatial_tessellation(self.pre_anonymized_tdf, "squared",
                                                       tiles=tiles)
 
-        self.anonymized_tdf = pandas.merge(self.anonymized_tdf, tiles, how="left", on="tile_ID")
+        self.anonymized_tdf = pandas.merge(self.anonymized_tdf, centroids, how="left", on="tile_ID")
         self.anonymized_tdf.rename(columns={
             constants.LATITUDE: 'orig_lat',
             constants.LONGITUDE: 'orig_lng',
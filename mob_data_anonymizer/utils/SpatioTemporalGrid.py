@@ -0,0 +1,105 @@
+import math
+
+import numpy as np
+from haversine import Unit, haversine, haversine_vector
+
+
+class SpatioTemporalGrid:
+    '''
+    Locations bucketed in the cells of a time-sliced spatial grid, so the locations within a spatial and temporal
+    distance of a point are found looking just at its cell and the adjacent ones (in space and time).
+    Cells are big enough for any location within cell_size (haversine) and time_slice (seconds) of a point to be in
+    an adjacent cell, whatever the latitude of the locations.
+    '''
+
+    def __init__(self, x: np.ndarray, y: np.ndarray, timestamps: np.ndarray, cell_size, time_slice,
+                 unit=Unit.KILOMETERS):
+        '''
+        :param x: longitudes of the locations
+        :param y: latitudes of the locations
+        :param timestamps: timestamps of the locations
+        :param cell_size: spatial distance covered by a cell (in unit)
+        :param time_slice: seconds covered by a cell
+        :param unit: unit of cell_size and the spatial distances
+        '''
+        self.x = np.asarray(x, dtype=float)
+        self.y = np.asarray(y, dtype=float)
+        self.timestamps = np.asarray(timestamps, dtype=np.int64)
+        self.unit = unit
+
+        # Degrees of latitude covered by cell_size, with a small margin for rounding errors
+        angle = cell_size / haversine((0, 0), (0, 1), unit=unit) * 1.000001
+        self.cell_height = min(max(angle, 1e-9), 180)
+        # Points within cell_size can be farther apart in longitude the closer to the poles. For latitudes up to
+        # max_lat, hav(d) >= cos(max_lat)² hav(lng difference)
+        max_lat = np.abs(self.y).max(initial=0)
+        cos_lat = math.cos(math.radians(min(max_lat + self.cell_height, 90)))
+        ratio = math.sin(math.radians(angle) / 2) / cos_lat if cos_lat > 0 else 1
+        cell_width = math.degrees(2 * math.asin(min(ratio, 1)))
+        # Cells of the same width around the globe, so the first and last ones are adjacent
+        self.n_columns = max(int(360 / max(cell_width, 1e-9)), 1)
+        self.cell_width = 360 / self.n_columns
+        self.time_slice = max(time_slice, 1)
+
+        # Locations sorted by cell, every cell is a slice of this order
+        columns, rows, slices = self.__get_cells(self.x, self.y, self.timestamps)
+        self.order = np.lexsort((columns, rows, slices))
+        if len(self.order) == 0:
+            self.cells = {}
+            return
+
+        keys = np.column_stack((slices, rows, columns))[self.order]
+        bounds = np.flatnonzero(np.any(keys[1:] != keys[:-1], axis=1)) + 1
+        starts = np.concatenate(([0], bounds)).tolist()
+        ends = np.concatenate((bounds, [len(self.order)])).tolist()
+        self.cells = {tuple(keys[start].tolist()): (start, end) for start, end in zip(starts, ends)}
+
+    def __get_cells(self, x, y, timestamps) -> tuple:
+        columns = np.floor((np.asarray(x) + 180) / self.cell_width).astype(np.int64) % self.n_columns
+        rows = np.floor((np.asarray(y) + 90) / self.cell_height).astype(np.int64)
+        slices = np.floor_divide(timestamps, self.time_slice).astype(np.int64)
+
+        return columns, rows, slices
+
+    def get_candidates(self, x, y, timestamp) -> np.ndarray:
+        '''
+        Locations in the cell of a point and the adjacent ones. They include all the locations within cell_size and
+        time_slice of the point.
+        :return: array of positions (not sorted)
+        '''
+        column, row, time_slice = (int(v) for v in self.__get_cells([x], [y], np.array([timestamp])))
+        columns = {(column + d) % self.n_columns for d in (-1, 0, 1)}
+
+        cells = []
+        for s in (time_slice - 1, time_slice, time_slice + 1):
+            for r in (row - 1, row, row + 1):
+                for c in columns:
+                    try:
+                        start, end = self.cells[(s, r, c)]
+                        cells.append(self.order[start:end])
+                    except KeyError:
+                        pass
+
+        if not cells:
+            return np.empty(0, dtype=self.order.dtype)
+
+        return np.concatenate(cells)
+
+    def get_neighbours(self, x, y, timestamp, R_s, R_t, candidates: np.ndarray = None) -> np.ndarray:
+        '''
+        Locations within a spatial (haversine) and temporal distance of a point, both ends included. R_s and R_t
+        can't be greater than the cell_size and time_slice of the grid.
+        :param candidates: positions to check, by default the ones in the adjacent cells (see get_candidates)
+        :return: sorted array of positions
+        '''
+        if candidates is None:
+            candidates = self.get_candidates(x, y, timestamp)
+
+        candidates = candidates[np.abs(self.timestamps[candidates] - timestamp) <= R_t]
+        if len(candidates) == 0:
+            return np.sort(candidates)
+
+        distances = haversine_vector(np.column_stack((self.y[candidates], self.x[candidates])), (y, x),
+                                     unit=self.unit, comb=True).ravel()
+
+        return np.sort(candidates[distances <= R_s])
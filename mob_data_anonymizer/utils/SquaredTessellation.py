@@ -0,0 +1,107 @@
+import math
+
+import numpy as np
+import pandas
+from geopandas import GeoDataFrame
+from pyproj import Transformer
+from shapely.geometry import Polygon
+from skmob.utils import constants
+from skmob.utils.constants import DEFAULT_CRS, UNIVERSAL_CRS
+
+
+class SquaredTessellation:
+    '''
+    Squared tessellation of a base shape, the same as skmob's squared tiler (tiles of meters x meters in the universal
+    crs, covering the bounds of the base shape) but without building the tile polygons. Tiles are the cells of a grid
+    whose edges are kept in longitude and latitude, so locations are mapped to tiles with vectorized searches instead
+    of a spatial join.
+    Tile ids are the ones of the skmob tiler: the tile in column i (x) and row j (y) has id i * n_rows + j.
+    '''
+
+    def __init__(self, base_shape, meters=250):
+        '''
+        :param base_shape: GeoDataFrame or GeoSeries to be covered by the tiles (as a bounding box built with
+                           _get_bounding_box)
+        :param meters: size of the tiles
+        '''
+        self.meters = meters
+
+        # Bounds of the base shape in the universal crs
+        min_x, min_y, max_x, max_y = base_shape.to_crs(UNIVERSAL_CRS).total_bounds
+        self.n_columns = int(math.ceil(math.fabs(max_x - min_x) / meters))
+        self.n_rows = int(math.ceil(math.fabs(min_y - max_y) / meters))
+        self.x_edges = min_x + meters * np.arange(self.n_columns + 1)
+        self.y_edges = min_y + meters * np.arange(self.n_rows + 1)
+
+        # Edges in longitude and latitude. Longitudes of the universal crs just depend on x and latitudes on y
+        transformer = Transformer.from_crs(UNIVERSAL_CRS, DEFAULT_CRS, always_xy=True)
+        self.lng_edges, _ = transformer.transform(self.x_edges, np.zeros(len(self.x_edges)))
+        _, self.lat_edges = transformer.transform(np.zeros(len(self.y_edges)), self.y_edges)
+
+    def __len__(self):
+        return self.n_columns * self.n_rows
+
+    def get_tile_ids(self, lng, lat) -> np.ndarray:
+        '''
+        Tiles of some locations. Like the spatial join used by skmob's mapping, a location is in a tile if it is within
+        the tile, not in its boundary.
+        :return: array of tile ids (int), -1 for the locations not within any tile
+        '''
+        lng = np.asarray(lng, dtype=float)
+        lat = np.asarray(lat, dtype=float)
+        columns = np.searchsorted(self.lng_edges, lng, side='right') - 1
+        rows = np.searchsorted(self.lat_edges, lat, side='right') - 1
+
+        # Locations right after an edge are in the tile, the ones in the edge are not (neither out of the grid)
+        is_within = (columns >= 0) & (columns < self.n_columns) & (rows >= 0) & (rows < self.n_rows)
+        is_within[is_within] = (self.lng_edges[columns[is_within]] < lng[is_within]) & \
+                               (self.lat_edges[rows[is_within]] < lat[is_within])
+
+        return np.where(is_within, columns * self.n_rows + rows, -1)
+
+    def mapping(self, tdf, remove_na=True):
+        '''
+        Same as tdf.mapping(tessellation) with the tiles of the skmob tiler: a copy of tdf with the tile_ID (str) of
+        every location
+        :param remove_na: whether to remove the locations not within any tile, their tile_ID is NaN if not
+        '''
+        tile_ids = self.get_tile_ids(tdf[constants.LONGITUDE], tdf[constants.LATITUDE])
+        is_mapped = tile_ids >= 0
+
+        if remove_na:
+            mtdf = tdf[is_mapped].copy()
+            mtdf[constants.TILE_ID] = tile_ids[is_mapped].astype(str).astype(object)
+        else:
+            mtdf = tdf.copy()
+            mtdf[constants.TILE_ID] = np.where(is_mapped, tile_ids.astype(str).astype(object), np.nan)
+
+        return mtdf
+
+    def get_centroids(self) -> pandas.DataFrame:
+        '''
+        :return: DataFrame with the tile_ID (str) and the centroid (x as longitude, y as latitude) of every tile
+        '''
+        tile_ids = np.arange(len(self))
+        columns, rows = np.divmod(tile_ids, self.n_rows)
+
+        return pandas.DataFrame({
+            constants.TILE_ID: tile_ids.astype(str).astype(object),
+            'x': (self.lng_edges[columns] + self.lng_edges[columns + 1]) / 2,
+            'y': (self.lat_edges[rows] + self.lat_edges[rows + 1]) / 2,
+        })
+
+    def to_geodataframe(self, crs=DEFAULT_CRS) -> GeoDataFrame:
+        '''
+        Tile polygons, as built by skmob's squared tiler (e.g. to be saved as GeoJSON)
+        '''
+        polygons = []
+        for i in range(self.n_columns):
+            x1, x2 = self.x_edges[i], self.x_edges[i + 1]
+            for j in range(self.n_rows):
+                y1, y2 = self.y_edges[j], self.y_edges[j + 1]
+                polygons.append(Polygon([(x1, y1), (x1, y2), (x2, y2), (x2, y1)]))
+
+        gdf = GeoDataFrame({constants.TILE_ID: np.arange(len(polygons)).astype(str)}, geometry=polygons,
+                           crs=UNIVERSAL_CRS)
+
+        return gdf.to_crs(crs)
@@ -12,12 +12,13 @@ from pandas import DateOffset
 from sklearn.metrics import accuracy_score
 from sklearn.model_selection import train_test_split
 from sklearn.utils import shuffle
-from skmob.tessellation import tilers
 from tqdm import tqdm
 import warnings
 
 warnings.filterwarnings('ignore')
 from mob_data_anonymizer.entities.Dataset import Dataset
+from mob_data_anonymizer.utils.TileSequences import TileSequences
+from mob_data_anonymizer.utils.tessellation import tessellation_cache, _get_bounding_box, DEFAULT_TILE_SIZE
 
 
 class Stats:
@@ -70,14 +71,9 @@ class Stats:
             ids[trajectory].append(trajectory.id)
 
         total_prob = 0
-        min_traj = None
         for traj_anom in tqdm(self.anonymized_dataset.trajectories):
-            min_dist = float('inf')
-            for traj_ori in self.original_dataset.trajectories:
-                dist = distance.compute_without_map(traj_ori, traj_anom)
-                if dist < min_dist:
-                    min_dist = dist
-                    min_traj = traj_ori
+            distances = distance.compute_one_to_many(traj_anom, self.original_dataset.trajectories)
+            min_traj = self.original_dataset.trajectories[np.argmin(distances)]
             ids_group = ids[min_traj]
             if traj_anom.id in ids_group:
                 count = control[min_traj]
@@ -111,7 +107,6 @@ class Stats:
 
         self.original_dataset.trajectories.sort(key=lambda x: x.distance_to_reference_trajectory)
         distances = [trajectory.distance_to_reference_trajectory for trajectory in self.original_dataset.trajectories]
-        min_traj = None
         total_prob = 0
         for trajectory_anom in tqdm(self.anonymized_dataset.trajectories):
             trajectory_anom.distance_to_reference_trajectory = \
@@ -119,13 +114,9 @@ class Stats:
             closest_trajectories = Stats.__take_closest_window(distances,
                                                                trajectory_anom.distance_to_reference_trajectory,
                                                                window_size)
-            min_dist = float('inf')
-            for pos in closest_trajectories:
-                trajectory = self.original_dataset.trajectories[pos]
-                dist = distance.compute_without_map(trajectory, trajectory_anom)
-                if dist < min_dist:
-                    min_dist = dist
-                    min_traj = trajectory
+            window = [self.original_dataset.trajectories[pos] for pos in closest_trajectories]
+            distances_window = distance.compute_one_to_many(trajectory_anom, window)
+            min_traj = window[np.argmin(distances_window)]
             ids_group = ids[min_traj]
             if trajectory_anom.id in ids_group:
                 count = control[min_traj]
@@ -191,14 +182,14 @@ class Stats:
 
         return [x for x in range(pos_before, pos_after + 1)]
 
-    def get_propensity_score(self, tiles_size=200, time_interval=None):
+    def get_propensity_score(self, tiles_size=DEFAULT_TILE_SIZE, time_interval=None):
 
         # Compute tessellation and data ranges for the original dataset
         logging.info(f"Tessellation")
 
-        tessellation = tilers.tiler.get("squared", base_shape=self.original_dataset.get_bounding_box(),
-                                        meters=tiles_size)
-        tessellation['tile_ID'] = pd.to_numeric(tessellation['tile_ID'])
+        # Bounding box of the tdf, as in Measures, so they share the tessellation
+        original_tdf = self.original_dataset.to_tdf()
+        tessellation = tessellation_cache.get(_get_bounding_box(original_tdf), "squared", tiles_size)
 
         datetime_ranges = None
         if time_interval:
@@ -212,9 +203,9 @@ class Stats:
 
             datetime_ranges = pd.date_range(min_datetime, max_datetime, freq=offset)
 
-        original_sequences = self.__compute_trajectory_sequences(self.original_dataset, tessellation, datetime_ranges)
+        original_sequences = self.__compute_trajectory_sequences(original_tdf, tessellation, datetime_ranges)
         print('trajectory sequences computed')
-        anonymized_sequences = self.__compute_trajectory_sequences(self.anonymized_dataset, tessellation,
+        anonymized_sequences = self.__compute_trajectory_sequences(self.anonymized_dataset.to_tdf(), tessellation,
                                                                    datetime_ranges)
 
         print('trajectory sequences computed 2')
@@ -293,14 +284,14 @@ class Stats:
 
         return v * 4.0
 
-    def __compute_trajectory_sequences(self, dataset, tessellation, datetime_ranges=None):
+    def __compute_trajectory_sequences(self, tdf, tessellation, datetime_ranges=None):
 
-        tdf = dataset.to_tdf()
-
-        max_tile_id = tessellation['tile_ID'].max()
+        max_tile_id = len(tessellation) - 1
         print(f'MAX tile: {max_tile_id}')
-        # Map locations to spatial tiles
-        st_tdf = tdf.mapping(tessellation, remove_na=True)
+        # Map locations to spatial tiles (numeric ids)
+        tile_ids = tessellation.get_tile_ids(tdf['lng'], tdf['lat'])
+        st_tdf = tdf[tile_ids >= 0].copy()
+        st_tdf['tile_ID'] = tile_ids[tile_ids >= 0]
 
         # Modify tiles_id based on time
         if datetime_ranges is not None:
@@ -324,14 +315,7 @@ class Stats:
 
         # Compute tiles sequences
         logging.info("Computing tile sequences")
-        sequences = {}
-
-        for index, l in st_tdf.iterrows():
-            try:
-                if l['tile_ID'] not in sequences[l['tid']]:
-                    sequences[l['tid']].append(l['tile_ID'])
-            except KeyError:
-                sequences[l['tid']] = [l['tile_ID']]
+        sequences = TileSequences(st_tdf['tid'], st_tdf['tile_ID']).get_sequences()
 
         # Padding
 
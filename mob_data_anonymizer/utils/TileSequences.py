@@ -0,0 +1,84 @@
+import numpy as np
+import pandas
+
+
+class TileSequences:
+    '''
+    Tile sequences of a set of trajectories: for every trajectory, the tiles it visits in order of first visit, without
+    repetitions. Trajectories (in order of first location) and tiles (in order of first visit) are coded as integers,
+    their positions within tids and tiles. Sequences are stored one after the other in a single array of tile codes,
+    the sequence of the trajectory with code i is sequence_tiles[offsets[i]:offsets[i + 1]].
+    Bigrams (pairs of consecutive tiles of a sequence) are packed in int64 keys (see pack_bigrams).
+    '''
+
+    def __init__(self, tids, tiles):
+        '''
+        :param tids: trajectory id of every location, in visit order (within each trajectory)
+        :param tiles: tile id of every location (not NaN)
+        '''
+        tid_codes, self.tids = pandas.factorize(np.asarray(tids))
+        tile_codes, self.tiles = pandas.factorize(np.asarray(tiles))
+
+        # First visit of every tile by every trajectory, grouped by trajectory in visit order
+        keys = tid_codes.astype(np.int64) * len(self.tiles) + tile_codes
+        _, first = np.unique(keys, return_index=True)
+        first = np.sort(first)
+        visits = first[np.argsort(tid_codes[first], kind='stable')]
+
+        self.sequence_tiles = tile_codes[visits].astype(np.int64)
+        self.offsets = np.concatenate(([0], np.cumsum(np.bincount(tid_codes[visits], minlength=len(self.tids)))))
+
+    def get_sequences(self) -> dict:
+        '''
+        :return: list of tile ids of every trajectory id (in order of first location)
+        '''
+        tiles = self.tiles[self.sequence_tiles].tolist()
+        offsets = self.offsets.tolist()
+
+        return {tid: tiles[start:end] for tid, start, end in zip(self.tids.tolist(), offsets[:-1], offsets[1:])}
+
+    def get_codes(self, tids, tiles) -> tuple:
+        '''
+        Codes of some trajectory and tile ids, -1 for the ones not in the sequences
+        '''
+        return pandas.Index(self.tids).get_indexer(tids), pandas.Index(self.tiles).get_indexer(tiles)
+
+    def pack_bigrams(self, first: np.ndarray, second: np.ndarray) -> np.ndarray:
+        '''
+        Keys of pairs of tile codes, second being -1 for a single tile
+        '''
+        return first.astype(np.int64) * (len(self.tiles) + 1) + (second + 1)
+
+    def unpack_bigrams(self, keys: np.ndarray) -> tuple:
+        return keys // (len(self.tiles) + 1), keys % (len(self.tiles) + 1) - 1
+
+    def get_bigrams(self) -> tuple:
+        '''
+        Sub sequences of every trajectory: pairs of consecutive tiles, or its single tile if it has just one. Every
+        trajectory has each bigram once at most, as tiles are not repeated within a sequence.
+        :return: trajectory codes and bigram keys, grouped by trajectory in visit order
+        '''
+        lengths = np.diff(self.offsets)
+        tid_codes = np.repeat(np.arange(len(self.tids)), lengths)
+        has_next = np.ones(len(self.sequence_tiles), dtype=bool)
+        has_next[self.offsets[1:][lengths > 0] - 1] = False
+        is_single = np.repeat(lengths == 1, lengths)
+
+        is_bigram = has_next | is_single
+        next_tiles = np.where(has_next, np.roll(self.sequence_tiles, -1), -1)
+        keys = self.pack_bigrams(self.sequence_tiles[is_bigram], next_tiles[is_bigram])
+
+        return tid_codes[is_bigram], keys
+
+    def count_bigrams(self) -> tuple:
+        '''
+        :return: sorted array of unique bigram keys, the number of trajectories with each of them, and the codes of
+                 those trajectories (sorted, grouped by bigram: the ones of the i-th bigram are
+                 trajectories[offsets[i]:offsets[i + 1]]) and offsets
+        '''
+        tid_codes, keys = self.get_bigrams()
+        order = np.lexsort((tid_codes, keys))
+        unique_keys, counts = np.unique(keys, return_counts=True)
+        offsets = np.concatenate(([0], np.cumsum(counts)))
+
+        return unique_keys, counts, tid_codes[order], offsets
@@ -13,6 +13,8 @@ from mob_data_anonymizer import PARAMETERS_FILE_DOESNT_EXIST, SUCCESS, PARAMETER
 from mob_data_anonymizer.methodName import MethodName
 from mob_data_anonymizer.analysis_methods.AnalysisMethodInterface import AnalysisMethodInterface
 from mob_data_anonymizer.anonymization_methods.AnonymizationMethodInterface import AnonymizationMethodInterface
+from mob_data_anonymizer.clustering.ClusteringInterface import ClusteringInterface
+from mob_data_anonymizer.clustering.ClusteringListener import LoggingListener
 from mob_data_anonymizer.anonymization_methods.SwapLocations.SwapLocations import SwapLocations
 from mob_data_anonymizer.anonymization_methods.Microaggregation.Microaggregation import Microaggregation
 from mob_data_anonymizer.anonymization_methods.Microaggregation.TimePartMicroaggregation import TimePartMicroaggregation
@@ -76,6 +78,11 @@ def anonymize_back(method, params, file, filename, task_id) -> str:
         filtered_file = data.get('preprocessed_file', DEFAULT_FILTERED_FILE)
         method.dataset.to_csv(f"{output_folder}{filtered_file}")
 
+    # Log the clustering progress of the task
+    clustering_method = getattr(method, "clustering_method", None)
+    if isinstance(clustering_method, ClusteringInterface):
+        clustering_method.add_listener(LoggingListener(f"Task {task_id}"))
+
     # Run method
     method.run()
 
@@ -1,3 +1,8 @@
+import hashlib
+import os
+import pickle
+from collections import OrderedDict
+
 import pandas as pd
 from shapely import geometry
 from geopandas import GeoDataFrame
@@ -7,6 +12,85 @@ from skmob.tessellation import tilers
 from skmob.utils import constants
 from skmob.utils.constants import DEFAULT_CRS
 
+from mob_data_anonymizer.utils.SquaredTessellation import SquaredTessellation
+
+# Size of the tiles (meters) of the measures of a dataset (see Measures and Stats.get_propensity_score), the same for
+# all of them so they share the tessellation (see tessellation_cache)
+DEFAULT_TILE_SIZE = 250
+
+
+class TessellationCache:
+    '''
+    Tiles computed for a base shape, tiles shape and size, so the tiling of the same area is computed once. The last
+    max_size tessellations are kept in memory and, if a folder is given, every tessellation is also saved there
+    (pickled) to be loaded by other processes or jobs.
+    Tiles are shared by every user of the cache, so they must not be modified.
+    '''
+
+    def __init__(self, max_size=8, folder=None):
+        '''
+        :param max_size: number of tessellations kept in memory (the least recently used ones are discarded)
+        :param folder: folder where tessellations are saved, None to keep them just in memory
+        '''
+        self.max_size = max_size
+        self.folder = folder
+        self.tiles = OrderedDict()
+
+    def get(self, bounding_box, tiles_shape, meters=250):
+        '''
+        :param bounding_box: GeoDataFrame with the bounding box (or any base shape) to be tessellated (see
+                             _get_bounding_box)
+        :return: tiles of the bounding box, as computed by build_tiles
+        '''
+        # Shapes with the same bounds can have different tiles (but for squared ones), so the key has the geometry
+        geometry_hash = hashlib.sha1(bounding_box.unary_union.wkb).hexdigest()
+        key = (geometry_hash, str(bounding_box.crs), tiles_shape, meters)
+
+        try:
+            self.tiles.move_to_end(key)
+            return self.tiles[key]
+        except KeyError:
+            tiles = self.__load(key)
+            if tiles is None:
+                tiles = build_tiles(bounding_box, tiles_shape, meters)
+                self.__save(key, tiles)
+
+            self.tiles[key] = tiles
+            if len(self.tiles) > self.max_size:
+                self.tiles.popitem(last=False)
+
+            return tiles
+
+    def clear(self):
+        self.tiles.clear()
+
+    def __get_path(self, key):
+        digest = hashlib.sha1(repr(key).encode()).hexdigest()
+        return os.path.join(self.folder, f"tiles_{key[2]}_{key[3]}_{digest}.pkl")
+
+    def __load(self, key):
+        if self.folder is None or not os.path.exists(self.__get_path(key)):
+            return None
+
+        with open(self.__get_path(key), 'rb') as file:
+            return pickle.load(file)
+
+    def __save(self, key, tiles):
+        if self.folder is None:
+            return
+
+        # Written to a temporary file first, so other processes never read a partial file
+        os.makedirs(self.folder, exist_ok=True)
+        path = self.__get_path(key)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'wb') as file:
+            pickle.dump(tiles, file)
+        os.replace(tmp_path, path)
+
+
+# Tessellations shared by the whole process (set its folder to persist them)
+tessellation_cache = TessellationCache()
+
 
 def _get_bounding_box(tdf):
     # Build bounding box for tesselation
@@ -30,9 +114,9 @@ def spatial_tessellation(tdf: TrajDataFrame, tiles_shape, meters=250, tiles=None
     '''
 
     :param tdf: tdf to be tessellated
-    :param tiles_shape:
+    :param tiles_shape: shape of the tiles (see build_tiles)
     :param meters: size of the tiles
-    :param tiles: If a tiles file is provided is used, if not the are computed
+    :param tiles: If a tiles file is provided is used, if not the are computed (or taken from tessellation_cache)
     :param bounding_box: If a bounding_box is not provided, it is computed
     :return: tuple of tdf mapped to tiles and tiles computed
     '''
@@ -43,14 +127,47 @@ def spatial_tessellation(tdf: TrajDataFrame, tiles_shape, meters=250, tiles=None
             # Compute bounding_box
             bounding_box = _get_bounding_box(tdf)
 
-        tiles = tilers.tiler.get(tiles_shape, base_shape=bounding_box, meters=meters)
+        tiles = tessellation_cache.get(bounding_box, tiles_shape, meters)
 
     # Map locations to tiles
-    mtdf = tdf.mapping(tiles, remove_na=True)
+    if isinstance(tiles, SquaredTessellation):
+        mtdf = tiles.mapping(tdf, remove_na=True)
+    else:
+        mtdf = tdf.mapping(tiles, remove_na=True)
 
     return mtdf, tiles
 
 
+def build_tiles(bounding_box, tiles_shape, meters=250):
+    '''
+
+    :param bounding_box: GeoDataFrame with the area to be tessellated
+    :param tiles_shape: shape of the tiles, squared tiles are built as a SquaredTessellation (no polygons)
+    :param meters: size of the tiles
+    :return: tiles covering the bounding box
+    '''
+    if tiles_shape == "squared":
+        return SquaredTessellation(bounding_box, meters)
+
+    return tilers.tiler.get(tiles_shape, base_shape=bounding_box, meters=meters)
+
+
+def get_centroids(tiles) -> pd.DataFrame:
+    '''
+
+    :param tiles: tiles computed by spatial_tessellation
+    :return: DataFrame with the tile_ID and the centroid (x as longitude, y as latitude) of every tile
+    '''
+    if isinstance(tiles, SquaredTessellation):
+        return tiles.get_centroids()
+
+    return pd.DataFrame({
+        constants.TILE_ID: tiles[constants.TILE_ID],
+        'x': tiles['geometry'].centroid.x,
+        'y': tiles['geometry'].centroid.y,
+    })
+
+
 def generalization(tdf: TrajDataFrame, size=250) -> TrajDataFrame:
     '''
 